@@ -0,0 +1,110 @@
+# -*- encoding: utf-8 -*-
+"""Latency of BraspagRequest calls on the IOLoop, with an HTTP client
+answering immediately with a recorded response, i.e. the overhead of the
+client itself: rendering, the coroutine layers and parsing.
+
+Each call is measured twice: through the current call path, where
+_request, _fetch_with_retry, _query, _render and _parse_response return
+Futures directly, and through CoroutineWrappedRequest, which wraps them in
+a coroutine again as before they were cut.
+"""
+from __future__ import absolute_import, print_function
+
+import logging
+import timeit
+from io import BytesIO
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPResponse
+from tornado.ioloop import IOLoop
+
+from braspag import BraspagRequest
+
+from .utils import MERCHANT_ID
+from .utils import recorded_body
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+class RecordedClient(object):
+    """HTTP client answering every request with the same body"""
+
+    def __init__(self, body):
+        self.body = body
+
+    def fetch(self, request):
+        future = Future()
+        future.set_result(HTTPResponse(request, 200, buffer=BytesIO(self.body)))
+        return future
+
+
+class CoroutineWrappedRequest(BraspagRequest):
+    """BraspagRequest with the previous call path: every internal layer is
+    a coroutine yielding the next one.
+    """
+
+    @gen.coroutine
+    def _render(self, template_name, data_dict):
+        xml = yield super(CoroutineWrappedRequest, self)._render(template_name, data_dict)
+        raise gen.Return(xml)
+
+    @gen.coroutine
+    def _parse_response(self, response_class, body, **kwargs):
+        response = yield super(CoroutineWrappedRequest, self)._parse_response(
+            response_class, body, **kwargs)
+        raise gen.Return(response)
+
+    @gen.coroutine
+    def _fetch_with_retry(self, xml, url, retry_policy=None, operation=None, timings=None):
+        response = yield super(CoroutineWrappedRequest, self)._fetch_with_retry(
+            xml, url, retry_policy, operation, timings)
+        raise gen.Return(response)
+
+    @gen.coroutine
+    def _request(self, xml, query=False, retry_policy=None, operation=None, timings=None):
+        response = yield super(CoroutineWrappedRequest, self)._request(
+            xml, query, retry_policy, operation, timings)
+        raise gen.Return(response)
+
+    @gen.coroutine
+    def _query(self, operation, key, template_name, context, response_class):
+        response = yield super(CoroutineWrappedRequest, self)._query(
+            operation, key, template_name, context, response_class)
+        raise gen.Return(response)
+
+
+def bench_calls(name, call, number=2000, repeat=5):
+    """Print the best latency of sequential calls"""
+    @gen.coroutine
+    def calls():
+        for _ in range(number):
+            yield call()
+
+    io_loop = IOLoop.current()
+    best = min(timeit.repeat(lambda: io_loop.run_sync(calls), number=1, repeat=repeat))
+    per_call = best / number * 1e6
+    print(u'{0:<50} {1:>10.2f} us/call {2:>12,.0f} calls/s'.format(name, per_call, 1e6 / per_call))
+
+
+def main():
+    logging.getLogger('braspag').setLevel(logging.WARNING)
+
+    for name, request_class in ((u'direct', BraspagRequest),
+                                (u'coroutine wrapped', CoroutineWrappedRequest)):
+        request = request_class(MERCHANT_ID, homologation=True)
+        request.http_client = RecordedClient(recorded_body('test_get_transaction_data', 1))
+        bench_calls(u'get_transaction_data ({0})'.format(name),
+                    lambda: request.get_transaction_data(transaction_id=TRANSACTION_ID))
+
+    for name, request_class in ((u'direct', BraspagRequest),
+                                (u'coroutine wrapped', CoroutineWrappedRequest)):
+        request = request_class(MERCHANT_ID, homologation=True)
+        request.http_client = RecordedClient(recorded_body('test_authorize_capture_refund', 1))
+        bench_calls(u'capture ({0})'.format(name),
+                    lambda: request.capture(transaction_id=TRANSACTION_ID, amount=100000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# -*- encoding: utf-8 -*-
+"""utils.extract_dict against xmltodict.parse of the whole envelope, on a
+recorded GetOrderData response and on one with 500 transactions, and the
+creation of eager and lazy responses.
+"""
+from __future__ import absolute_import, print_function
+
+from braspag.response import BraspagOrderDataResponse
+from braspag.utils import extract_dict
+
+from .utils import bench
+from .utils import recorded_body
+
+try:
+    import xmltodict
+except ImportError:  # xmltodict is no longer a dependency
+    xmltodict = None
+
+
+def make_large_body(body, count):
+    """Repeat the transaction of a GetOrderData response"""
+    start = body.index('<OrderTransactionDataResponse>')
+    end = body.index('</TransactionDataCollection>')
+    return body[:start] + body[start:end] * count + body[end:]
+
+
+def main():
+    body = recorded_body('test_get_order_data', 1)
+    path = BraspagOrderDataResponse.RESULT_PATH
+
+    for name, xml, number in (('GetOrderData', body, 5000),
+                              ('GetOrderData x500', make_large_body(body, 500), 10)):
+        if xmltodict is not None:
+            bench(u'{0} xmltodict.parse'.format(name),
+                  lambda: xmltodict.parse(xml), number=number)
+        bench(u'{0} extract_dict'.format(name),
+              lambda: extract_dict(xml, path), number=number)
+        bench(u'{0} BraspagOrderDataResponse'.format(name),
+              lambda: BraspagOrderDataResponse(xml), number=number)
+        bench(u'{0} BraspagOrderDataResponse lazy'.format(name),
+              lambda: BraspagOrderDataResponse(xml, lazy=True), number=number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- encoding: utf-8 -*-
+"""Per-call cost of the request and response logging of BaseRequest.fetch,
+with INFO disabled and enabled, against the previous pipeline that always
+masked and formatted both payloads with two re.sub passes each.
+"""
+from __future__ import absolute_import, print_function
+
+import logging
+import re
+
+from tornado.escape import to_unicode
+
+from braspag import render
+from braspag.utils import mask_card_data_from_xml
+
+from .utils import AUTHORIZE_CONTEXT
+from .utils import bench
+from .utils import recorded_body
+
+
+logger = logging.getLogger('braspag.bench')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+URL = 'https://www.pagador.com.br/webservice/pagadorTransaction.asmx'
+
+
+def mask_two_passes(xml):
+    """mask_card_data_from_xml before the single pass"""
+    def mask_card_number(match_obj):
+        card_number = match_obj.group(1)
+        return u'<CardNumber>{0}{1}{2}</CardNumber>'.format(card_number[:6], u'*' * 6, card_number[-4:])
+
+    def mask_card_security_code(match_obj):
+        return u'<CardSecurityCode>{0}</CardSecurityCode>'.format(u'*' * len(match_obj.group(1)))
+
+    xml = re.sub(r'<CardNumber>(\d*)</CardNumber>', mask_card_number, xml)
+    xml = re.sub(r'<CardSecurityCode>(\d*)</CardSecurityCode>', mask_card_security_code, xml)
+    return xml
+
+
+def log_always(xml, body):
+    logger.info(u'URL: {url} - Request: {body}'.format(url=URL, body=mask_two_passes(xml)))
+    logger.info(u'Response code: {code} body: {body}'.format(
+        code=200, body=mask_two_passes(to_unicode(body))))
+
+
+def log_gated(xml, body):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(u'URL: {url} - Request: {body}'.format(url=URL, body=mask_card_data_from_xml(xml)))
+        logger.info(u'Response code: {code} body: {body}'.format(
+            code=200, body=mask_card_data_from_xml(to_unicode(body))))
+
+
+def main():
+    xml = render.render_template('authorize.xml', dict(AUTHORIZE_CONTEXT))
+    body = recorded_body('test_authorize', 0)
+
+    for level in (logging.WARNING, logging.INFO):
+        logger.setLevel(level)
+        name = logging.getLevelName(level)
+        bench(u'{0} previous'.format(name), lambda: log_always(xml, body))
+        bench(u'{0} gated single pass'.format(name), lambda: log_gated(xml, body))
+
+
+if __name__ == '__main__':
+    main()
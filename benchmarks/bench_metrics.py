@@ -0,0 +1,36 @@
+# -*- encoding: utf-8 -*-
+"""Overhead of the Metrics instrumentation on BraspagRequest calls, and
+cost of recording a latency in a Histogram.
+"""
+from __future__ import absolute_import, print_function
+
+import logging
+import random
+
+from braspag import BraspagRequest
+from braspag.metrics import Histogram, Metrics
+
+from .bench_call_latency import RecordedClient, TRANSACTION_ID, bench_calls
+from .utils import MERCHANT_ID
+from .utils import bench
+from .utils import recorded_body
+
+
+def main():
+    logging.getLogger('braspag').setLevel(logging.WARNING)
+    body = recorded_body('test_get_transaction_data', 1)
+
+    for name, instrumentation in ((u'without metrics', None), (u'with metrics', [Metrics()])):
+        request = BraspagRequest(MERCHANT_ID, homologation=True, instrumentation=instrumentation)
+        request.http_client = RecordedClient(body)
+        bench_calls(u'get_transaction_data ' + name,
+                    lambda: request.get_transaction_data(transaction_id=TRANSACTION_ID))
+
+    histogram = Histogram()
+    latencies = [int(random.lognormvariate(12, 1)) for _ in range(1000)]
+    bench(u'Histogram.record x1000', lambda: [histogram.record(l) for l in latencies])
+    bench(u'Histogram.percentile', lambda: histogram.percentile(0.99))
+
+
+if __name__ == '__main__':
+    main()
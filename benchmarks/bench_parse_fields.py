@@ -0,0 +1,60 @@
+# -*- encoding: utf-8 -*-
+"""PagadorResponse.parse_xml with the fields indexed by tag, against the
+previous loop over every field for every element, on recorded
+GetCustomerData and GetBraspagOrderId responses.
+"""
+from __future__ import absolute_import, print_function
+
+import xml.etree.ElementTree as ET
+
+from braspag.response import BraspagOrderIdResponse
+from braspag.response import CustomerDataResponse
+from braspag.utils import to_unicode
+
+from .utils import bench
+from .utils import recorded_body
+
+
+def parse_xml_per_field(self, xml):
+    """parse_xml before the field index"""
+    for field in self._fields:
+        setattr(self, field, None)
+
+    xml = ET.fromstring(xml)
+    for elem in xml.iter():
+        for field, tag_info in self._fields.items():
+            if isinstance(tag_info, (list, tuple)):
+                tag, convert = tag_info
+            else:
+                tag = tag_info
+                convert = to_unicode
+
+            if elem.tag.endswith('}' + tag):
+                value = convert(unicode(elem.text).strip())
+                setattr(self, field, value)
+            elif elem.tag.endswith('}ErrorReportDataResponse'):
+                error = self._get_error(elem)
+                self.errors = self._put_error(error, self.errors)
+            elif elem.tag == 'faultstring':
+                error = [0, elem.text]
+                self.errors = self._put_error(error, self.errors)
+
+
+def main():
+    responses = (
+        ('GetCustomerData', CustomerDataResponse, recorded_body('test_get_customer_data', 2)),
+        ('GetBraspagOrderId', BraspagOrderIdResponse, recorded_body('test_get_customer_data', 1)),
+    )
+
+    for name, response_class, body in responses:
+        response = response_class(body)
+        indexed = response_class.parse_xml
+
+        bench(u'{0} per-field loop'.format(name),
+              lambda: parse_xml_per_field(response, body), number=2000)
+        bench(u'{0} tag index'.format(name),
+              lambda: indexed(response, body), number=2000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+# -*- encoding: utf-8 -*-
+"""Render throughput of a per-instance Jinja environment, as built by the
+request objects before, against the shared compile-once environment.
+"""
+from __future__ import absolute_import, print_function
+
+import jinja2
+
+from braspag import render
+
+from .utils import AUTHORIZE_CONTEXT
+from .utils import CAPTURE_CONTEXT
+from .utils import bench
+
+
+def main():
+    per_instance_env = jinja2.Environment(
+        autoescape=True,
+        loader=jinja2.PackageLoader('braspag'),
+    )
+
+    for template_name, context in (('authorize.xml', AUTHORIZE_CONTEXT),
+                                   ('base.xml', CAPTURE_CONTEXT)):
+        bench(u'{0} per-instance environment'.format(template_name),
+              lambda: per_instance_env.get_template(template_name).render(context))
+        bench(u'{0} shared environment'.format(template_name),
+              lambda: render.get_template(template_name).render(context))
+
+    # a new client per merchant used to compile every template again
+    bench(u'new environment + authorize.xml',
+          lambda: jinja2.Environment(
+              autoescape=True,
+              loader=jinja2.PackageLoader('braspag'),
+          ).get_template('authorize.xml').render(AUTHORIZE_CONTEXT), number=100)
+
+
+if __name__ == '__main__':
+    main()
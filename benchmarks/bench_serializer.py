@@ -0,0 +1,41 @@
+# -*- encoding: utf-8 -*-
+"""Per-call cost of BaseRequest._render_template for the fixed-shape
+templates, rendered with Jinja against the fragments of FixedTemplate.
+"""
+from __future__ import absolute_import, print_function
+
+from braspag import BraspagRequest
+from braspag import render
+
+from .utils import CAPTURE_CONTEXT
+from .utils import MERCHANT_ID
+from .utils import bench
+
+
+CONTEXTS = (
+    ('base.xml', CAPTURE_CONTEXT),
+    ('get_transaction_data.xml', {
+        'request_id': u'782a56e2-2dae-11e2-b3ee-080027d29772',
+        'transaction_id': u'53a90294-e8b4-4e63-9f83-1e69ac387034',
+    }),
+    ('get_card.xml', {
+        'just_click_key': u'e99d7c94-d3cd-4ef6-aa38-0245703bfbb8',
+        'just_click_alias': u'alias',
+    }),
+)
+
+
+def main():
+    request = BraspagRequest(MERCHANT_ID, homologation=True)
+
+    for fast_templates in (False, True):
+        render.configure(fast_templates=fast_templates)
+        label = fast_templates and 'fixed template' or 'jinja'
+
+        for template_name, context in CONTEXTS:
+            bench(u'{0} {1}'.format(template_name, label),
+                  lambda: request._render_template(template_name, dict(context)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+"""utils.to_date against datetime.strptime, alone and on a GetOrderData
+response with 500 transactions, with shared and with distinct dates.
+"""
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+from datetime import timedelta
+
+from braspag import response
+from braspag import utils
+from braspag.response import BraspagOrderDataResponse
+
+from .bench_extract_dict import make_large_body
+from .utils import bench
+from .utils import recorded_body
+
+
+def to_date_strptime(value):
+    """to_date before the dedicated parser"""
+    return datetime.strptime(value, utils.DATE_FORMAT)
+
+
+def use_converter(convert):
+    """Parse the transaction dates of dict responses with convert"""
+    response.OPTIONAL_TRANSACTION_FIELDS = tuple(
+        (field, tag, convert if tag.endswith('Date') else field_convert)
+        for field, tag, field_convert in response.OPTIONAL_TRANSACTION_FIELDS
+    )
+
+
+def make_distinct_dates(body):
+    """Give each transaction of the body its own ReceivedDate"""
+    parts = body.split('<ReceivedDate>')
+    start = datetime(2018, 10, 25)
+    for index in range(1, len(parts)):
+        date = (start + timedelta(seconds=index)).strftime(utils.DATE_FORMAT)
+        parts[index] = date + parts[index][parts[index].index('</ReceivedDate>'):]
+    return '<ReceivedDate>'.join(parts)
+
+
+def main():
+    value = '10/25/2018 11:35:52 PM'
+    bench(u'strptime', lambda: to_date_strptime(value), number=20000)
+    bench(u'_parse_date', lambda: utils._parse_date(value), number=20000)
+    bench(u'to_date cached', lambda: utils.to_date(value), number=20000)
+
+    body = make_large_body(recorded_body('test_get_order_data', 1), 500)
+    for name, xml in ((u'shared dates', body), (u'distinct dates', make_distinct_dates(body))):
+        try:
+            use_converter(to_date_strptime)
+            bench(u'GetOrderData x500 {0} strptime'.format(name),
+                  lambda: BraspagOrderDataResponse(xml), number=10)
+
+            use_converter(utils.to_date)
+            bench(u'GetOrderData x500 {0} to_date'.format(name),
+                  lambda: (utils._dates.clear(), BraspagOrderDataResponse(xml)), number=10)
+        finally:
+            use_converter(utils.to_date)
+
+
+if __name__ == '__main__':
+    main()
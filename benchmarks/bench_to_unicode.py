@@ -0,0 +1,48 @@
+# -*- encoding: utf-8 -*-
+"""CustomerDataResponse parsing with utils.to_unicode skipping unescape
+for values without entities, against unescaping every value.
+"""
+from __future__ import absolute_import, print_function
+
+from braspag import response
+from braspag.response import CustomerDataResponse
+from braspag.utils import to_unicode
+from braspag.utils import unescape
+
+from .utils import bench
+from .utils import recorded_body
+
+
+def to_unicode_unescape(value):
+    """to_unicode before the fast path"""
+    if isinstance(value, str):
+        value = value.decode('utf-8')
+
+    return unescape(value)
+
+
+def use_converter(convert):
+    """Rebuild the field index of CustomerDataResponse with convert"""
+    response.to_unicode = convert
+    if '_field_index' in CustomerDataResponse.__dict__:
+        del CustomerDataResponse._field_index
+
+
+def main():
+    body = recorded_body('test_get_customer_data', 2)
+
+    bench(u'to_unicode unescape', lambda: to_unicode_unescape(u'José da Silva'), number=50000)
+    bench(u'to_unicode fast path', lambda: to_unicode(u'José da Silva'), number=50000)
+
+    try:
+        use_converter(to_unicode_unescape)
+        bench(u'CustomerDataResponse unescape', lambda: CustomerDataResponse(body), number=5000)
+
+        use_converter(to_unicode)
+        bench(u'CustomerDataResponse fast path', lambda: CustomerDataResponse(body), number=5000)
+    finally:
+        use_converter(to_unicode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+# -*- encoding: utf-8 -*-
+"""Memory and construction time of the transactions built by
+PagadorDictResponse.format_transactions: dicts by default, TransactionRecord
+objects with ``compact=True``.
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+
+from braspag.response import BraspagOrderDataResponse
+from braspag.utils import extract_dict
+
+from .utils import bench
+from .utils import recorded_body
+
+
+def main():
+    body = recorded_body('test_get_order_data', 1)
+    item = extract_dict(body, BraspagOrderDataResponse.RESULT_PATH)[
+        'TransactionDataCollection']['OrderTransactionDataResponse']
+
+    for name, compact in ((u'dict', False), (u'TransactionRecord', True)):
+        response = BraspagOrderDataResponse(body, compact=compact)
+        print(u'{0:<50} {1:>10} bytes'.format(name, sys.getsizeof(response.transactions[0])))
+
+        def format_transactions():
+            response.transactions = []
+            response.format_transactions(item)
+
+        bench(name, format_transactions, number=20000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- encoding: utf-8 -*-
+"""Helpers shared by the benchmarks, run them from the repository root:
+
+    python -m benchmarks.bench_render
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import timeit
+
+import yaml
+
+
+CASSETTES_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'cassettes')
+
+MERCHANT_ID = u'F9B44052-4AE0-E311-9406-0026B939D54B'
+
+AUTHORIZE_CONTEXT = {
+    'request_id': u'782a56e2-2dae-11e2-b3ee-080027d29772',
+    'merchant_id': MERCHANT_ID,
+    'order_id': u'2cf84e51-c45b-45d9-9f64-554a6e088668',
+    'customer_id': u'12345678900',
+    'customer_name': u'José da Silva',
+    'customer_email': u'jose123@dasilva.com.br',
+    'transactions': [{
+        'amount': 100000,
+        'card_holder': u'Jose da Silva',
+        'card_number': u'0000000000000001',
+        'card_security_code': u'123',
+        'card_exp_date': u'05/2018',
+        'save_card': 'true',
+        'payment_method': 997,
+        'number_of_payments': 1,
+        'payment_plan': 0,
+        'currency': 'BRL',
+        'country': 'BRA',
+        'transaction_type': '1',
+        'soft_descriptor': 'Sax Alto',
+    }],
+}
+
+CAPTURE_CONTEXT = {
+    'request_id': u'782a56e2-2dae-11e2-b3ee-080027d29772',
+    'merchant_id': MERCHANT_ID,
+    'type': 'Capture',
+    'transactions': [{
+        'transaction_id': u'53a90294-e8b4-4e63-9f83-1e69ac387034',
+        'amount': 100000,
+    }],
+}
+
+
+def recorded_body(cassette, index):
+    """Return the response body of the index-th interaction of a cassette"""
+    with open(os.path.join(CASSETTES_DIR, '{}.yml'.format(cassette))) as f:
+        interactions = yaml.load(f, Loader=yaml.Loader)['interactions']
+
+    body = interactions[index]['response']['body']['string']
+    if isinstance(body, unicode):
+        body = body.encode('utf-8')
+    return body
+
+
+def bench(name, func, number=10000, repeat=3):
+    """Print the best time per call, in microseconds"""
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    per_call = best / number * 1e6
+    print(u'{0:<50} {1:>10.2f} us/call {2:>12,.0f} calls/s'.format(name, per_call, 1e6 / per_call))
+    return per_call
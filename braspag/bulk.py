@@ -0,0 +1,113 @@
+# -*- encoding: utf-8 -*-
+from __future__ import absolute_import
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+from tornado.queues import Queue
+
+
+_DONE = object()
+
+
+class BulkExecutor(object):
+    """Call an operation for each item of an iterable, with bounded
+    concurrency and an optional rate limit, yielding the results as they
+    complete::
+
+        bulk = request.bulk('capture', items, concurrency=20, rate_limit=50)
+        while (yield bulk.fetch_next()):
+            item, result = bulk.next_result()
+
+    ``result`` is the operation response, or the exception it raised.
+
+    Items are pulled from the iterable only when a worker is free and at
+    most ``concurrency`` results wait to be consumed, so memory usage does
+    not depend on the number of items.
+
+    :arg method: Coroutine called with each item as keyword arguments.
+    :arg items: Iterable of dicts with the operation arguments.
+    :arg concurrency: Maximum number of concurrent calls.
+    :arg rate_limit: Maximum number of calls started per second.
+    """
+
+    def __init__(self, method, items, concurrency=10, rate_limit=None):
+        assert concurrency >= 1, 'concurrency must be at least 1'
+
+        self.method = method
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+
+        self._items = iter(items)
+        self._results = Queue(maxsize=concurrency)
+        self._workers = 0
+        self._next_start = 0
+        self._started = False
+        self._finished = False
+        self._error = None
+        self._current = None
+
+    def _start(self):
+        self._started = True
+        self._workers = self.concurrency
+        io_loop = IOLoop.current()
+        for _ in range(self.concurrency):
+            io_loop.spawn_callback(self._work)
+
+    @gen.coroutine
+    def _throttle(self):
+        if not self.rate_limit:
+            return
+
+        now = IOLoop.current().time()
+        start = max(now, self._next_start)
+        self._next_start = start + 1.0 / self.rate_limit
+        if start > now:
+            yield gen.sleep(start - now)
+
+    @gen.coroutine
+    def _work(self):
+        try:
+            while self._error is None:
+                try:
+                    item = next(self._items)
+                except StopIteration:
+                    break
+
+                yield self._throttle()
+                try:
+                    result = yield self.method(**item)
+                except Exception as e:
+                    result = e
+                yield self._results.put((item, result))
+        except Exception as e:
+            # the items iterable itself failed
+            self._error = e
+        finally:
+            self._workers -= 1
+            if not self._workers:
+                self._results.put(_DONE)
+
+    @gen.coroutine
+    def fetch_next(self):
+        """Wait for the next result. Resolves to False once every item has
+        been processed.
+        """
+        if not self._started:
+            self._start()
+
+        if self._finished:
+            raise gen.Return(False)
+
+        result = yield self._results.get()
+        if result is _DONE:
+            self._finished = True
+            if self._error is not None:
+                raise self._error
+            raise gen.Return(False)
+
+        self._current = result
+        raise gen.Return(True)
+
+    def next_result(self):
+        """Return the (item, result) pair fetched by fetch_next()"""
+        return self._current
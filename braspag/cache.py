@@ -0,0 +1,191 @@
+# -*- encoding: utf-8 -*-
+from __future__ import absolute_import
+
+import time
+from collections import OrderedDict
+
+
+# queries identified by a Braspag GUID, which is case insensitive. The
+# other keys, e.g. the order id of get_braspag_order_id_by_order chosen by
+# the merchant, are used as given.
+GUID_OPERATIONS = frozenset([
+    'get_order_id_by_transaction_id',
+    'get_customer_data',
+    'get_transaction_data',
+    'get_order_data',
+])
+
+
+class ResponseCache(object):
+    """Bounded LRU cache of parsed query responses.
+
+    Entries expire after the TTL of their operation. Each entry is also
+    indexed by the Braspag transaction ids found in the response, so a
+    capture, void or refund of a transaction evicts every cached response
+    mentioning it.
+
+    :arg max_size: Maximum number of cached responses.
+    :arg ttl: Default time to live, in seconds.
+    :arg ttls: Dict of TTLs by operation name. A TTL of 0 or None disables
+               the cache for the operation.
+
+    The cached objects are shared by every caller, which must not change
+    them.
+
+    A query started before a transaction is invalidated must not cache
+    its, possibly stale, response: it passes ``generation()``, taken
+    before fetching, to ``set``.
+    """
+
+    def __init__(self, max_size=1000, ttl=60, ttls=None, clock=time.time):
+        assert max_size > 0, 'max_size must be positive'
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()
+        self._keys_by_transaction = {}
+
+        # transaction id -> generation of its last invalidation, bounded
+        # by max_size. Queries older than a forgotten invalidation are
+        # never cached.
+        self._generation = 0
+        self._invalidated = OrderedDict()
+        self._forgotten_generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_ttl(self, operation):
+        return self.ttls.get(operation, self.ttl)
+
+    def generation(self):
+        """Return the current invalidation generation, see ``set``"""
+        return self._generation
+
+    def get(self, operation, key):
+        """Return the cached response, or None"""
+        cache_key = (operation, query_key(operation, key))
+        entry = self._entries.pop(cache_key, None)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, response, transaction_ids = entry
+        if expires_at <= self.clock():
+            self._unindex(cache_key, transaction_ids)
+            self.misses += 1
+            return None
+
+        # most recently used entries are kept at the end
+        self._entries[cache_key] = entry
+        self.hits += 1
+        return response
+
+    def set(self, operation, key, response, transaction_ids=(), generation=None):
+        """Cache a response.
+
+        :arg generation: Value of ``generation()`` when the query started.
+                         The response is not cached if one of its
+                         transactions was invalidated since.
+        """
+        ttl = self.get_ttl(operation)
+        if not ttl:
+            return
+
+        transaction_ids = frozenset(_normalize_guid(t) for t in transaction_ids)
+        if generation is not None and self._invalidated_since(generation, transaction_ids):
+            return
+
+        cache_key = (operation, query_key(operation, key))
+        self._remove(cache_key)
+
+        while len(self._entries) >= self.max_size:
+            oldest_key, (_, _, oldest_ids) = self._entries.popitem(last=False)
+            self._unindex(oldest_key, oldest_ids)
+            self.evictions += 1
+
+        self._entries[cache_key] = (self.clock() + ttl, response, transaction_ids)
+        for transaction_id in transaction_ids:
+            self._keys_by_transaction.setdefault(transaction_id, set()).add(cache_key)
+
+    def invalidate(self, operation, key):
+        if self._remove((operation, query_key(operation, key))):
+            self.invalidations += 1
+
+    def invalidate_transaction(self, transaction_id):
+        """Remove every response mentioning the transaction"""
+        transaction_id = _normalize_guid(transaction_id)
+
+        self._generation += 1
+        self._invalidated.pop(transaction_id, None)
+        self._invalidated[transaction_id] = self._generation
+        while len(self._invalidated) > self.max_size:
+            _, self._forgotten_generation = self._invalidated.popitem(last=False)
+
+        cache_keys = self._keys_by_transaction.get(transaction_id, ())
+        for cache_key in list(cache_keys):
+            if self._remove(cache_key):
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_transaction.clear()
+        # queries in flight must not fill the cache again
+        self._generation += 1
+        self._invalidated.clear()
+        self._forgotten_generation = self._generation
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _invalidated_since(self, generation, transaction_ids):
+        if generation < self._forgotten_generation:
+            return True
+        return any(self._invalidated.get(t, 0) > generation for t in transaction_ids)
+
+    def _remove(self, cache_key):
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return False
+
+        self._unindex(cache_key, entry[2])
+        return True
+
+    def _unindex(self, cache_key, transaction_ids):
+        for transaction_id in transaction_ids:
+            cache_keys = self._keys_by_transaction.get(transaction_id)
+            if cache_keys is not None:
+                cache_keys.discard(cache_key)
+                if not cache_keys:
+                    del self._keys_by_transaction[transaction_id]
+
+
+def query_key(operation, key):
+    """Return the key identifying a query, case insensitive for the
+    GUID_OPERATIONS.
+    """
+    if operation in GUID_OPERATIONS:
+        return _normalize_guid(key)
+    return key
+
+
+def _normalize_guid(guid):
+    if not isinstance(guid, basestring):
+        guid = unicode(guid)
+    return guid.lower()
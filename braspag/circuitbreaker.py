@@ -0,0 +1,108 @@
+# -*- encoding: utf-8 -*-
+from __future__ import absolute_import
+
+import time
+from collections import deque
+
+from .exceptions import CircuitOpenError
+
+
+class CircuitBreaker(object):
+    """Stop calling an endpoint that keeps failing or answering too slowly.
+
+    The outcome of the last ``window`` calls is kept. Once at least
+    ``min_calls`` are recorded and the rate of failed calls reaches
+    ``error_threshold`` the circuit opens and every call fails fast with
+    :class:`~braspag.exceptions.CircuitOpenError`. After ``reset_timeout``
+    seconds a single trial call is let through (half-open state): the
+    circuit closes again if it succeeds and reopens otherwise. The outcome
+    of the other calls still running, started before the circuit opened,
+    is ignored meanwhile.
+
+    :arg name: Name of the protected endpoint, usually its URL.
+    :arg error_threshold: Rate of failed calls, from 0 to 1, that opens the
+                          circuit.
+    :arg latency_threshold: Calls slower than this, in seconds, are counted
+                            as failures. *Default: None (disabled)*.
+    :arg window: Number of recent calls taken into account.
+    :arg min_calls: Minimum number of calls before the circuit can open.
+    :arg reset_timeout: Seconds the circuit stays open before a trial call.
+    :arg on_state_change: Callable receiving ``(breaker, old_state, new_state)``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, error_threshold=0.5, latency_threshold=None, window=20,
+                 min_calls=10, reset_timeout=30, on_state_change=None, clock=time.time):
+        assert 0 < error_threshold <= 1, 'error_threshold must be between 0 and 1'
+        assert 0 < min_calls <= window, 'min_calls must be between 1 and window'
+
+        self.name = name
+        self.error_threshold = error_threshold
+        self.latency_threshold = latency_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+        self.clock = clock
+
+        self.state = self.CLOSED
+        self.opened_at = None
+        self._outcomes = deque(maxlen=window)
+        self._trial = None
+
+    @property
+    def error_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / float(len(self._outcomes))
+
+    def _set_state(self, state):
+        old_state, self.state = self.state, state
+        if state == self.OPEN:
+            self.opened_at = self.clock()
+
+        if self.on_state_change is not None and old_state != state:
+            self.on_state_change(self, old_state, state)
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be made.
+
+        Return the token of the trial call, to be given to record(), or None
+        for the other calls.
+        """
+        if self.state == self.OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(self.name)
+            self._set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._trial is not None:
+                raise CircuitOpenError(self.name)
+            self._trial = object()
+            return self._trial
+
+        return None
+
+    def record(self, failed, latency=None, trial=None):
+        """Record the outcome of a call made after before_call(), with the
+        token it returned.
+        """
+        if (not failed and self.latency_threshold is not None and
+                latency is not None and latency > self.latency_threshold):
+            failed = True
+
+        if self.state == self.HALF_OPEN:
+            # only the trial call closes or reopens the circuit
+            if trial is None or trial is not self._trial:
+                return
+            self._trial = None
+            self._outcomes.clear()
+            self._set_state(self.OPEN if failed else self.CLOSED)
+            return
+
+        self._outcomes.append(failed)
+        if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls and
+                self.error_rate >= self.error_threshold):
+            self._set_state(self.OPEN)
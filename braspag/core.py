@@ -1,15 +1,13 @@
 # -*- encoding: utf-8 -*-
 from __future__ import absolute_import
 
+import time
 import uuid
 import logging
 import unicodedata
 import urlparse
 
-import jinja2
-
-from .extensions.newrelic.contextmanager import newrelic_external_trace
-from .utils import spaceless
+from . import render
 from .utils import is_valid_guid
 from .utils import mask_card_data_from_xml
 from .exceptions import BraspagException
@@ -26,14 +24,23 @@ from .response import AddCardResponse
 from .response import GetCardResponse
 from .response import InvalidateCardResponse
 from .response import BraspagOrderIdDataResponse
+from .response import PagadorDictResponse
 from .consts import TransactionType
 from .consts import PaymentPlanType
+from .transport import Transport
+from .retry import DEFAULT_RETRY_POLICY
+from .circuitbreaker import CircuitBreaker
+from .bulk import BulkExecutor
+from .cache import query_key
+from .instrumentation import CallRecord
+from .timings import Timings, clock
 from xml.dom import minidom
 
+from tornado.concurrent import Future
 from tornado.httpclient import HTTPRequest
 from tornado.httpclient import HTTPError
 from tornado.escape import to_unicode
-from tornado import httpclient
+from tornado.ioloop import IOLoop
 from tornado import gen
 
 
@@ -41,15 +48,16 @@ logger = logging.getLogger(__name__)
 
 
 class BaseRequest(object):
-    def __init__(self, merchant_id=None, homologation=False, request_timeout=10):
+    def __init__(self, merchant_id=None, homologation=False, request_timeout=10,
+                 transport=None, retry_policies=None, circuit_breaker=None,
+                 executor=None, offload_threshold=65536, offload_render=False,
+                 payload_logging=None, instrumentation=None, slow_call_threshold=None):
         self.merchant_id = merchant_id
 
-        self.jinja_env = jinja2.Environment(
-            autoescape=True,
-            loader=jinja2.PackageLoader('braspag'),
-        )
+        self.jinja_env = render.get_environment()
 
-        self.http_client = httpclient.AsyncHTTPClient()
+        self.transport = transport or Transport()
+        self.http_client = self.transport.create_client()
 
         # services
         self.query_service = '/services/pagadorQuery.asmx'
@@ -58,6 +66,45 @@ class BaseRequest(object):
         # timeout
         self.request_timeout = request_timeout
 
+        # RetryPolicy by operation name, overriding the default one
+        self.retry_policies = retry_policies or {}
+
+        # CircuitBreaker keyword arguments, one breaker is created per URL
+        self.circuit_breaker_options = circuit_breaker
+        self.circuit_breakers = {}
+
+        # concurrent.futures executor parsing the responses of at least
+        # offload_threshold bytes and, with offload_render, rendering the
+        # requests, off the IOLoop thread
+        self.executor = executor
+        self.offload_threshold = offload_threshold
+        self.offload_render = offload_render
+
+        # logsink.PayloadLogging, limiting the payloads logged
+        self.payload_logging = payload_logging
+
+        # Instrumentation hooks called around each HTTP call
+        self.instrumentation = list(instrumentation or ())
+
+        # calls taking at least this number of seconds are logged with
+        # their timings
+        self.slow_call_threshold = slow_call_threshold
+
+    def transport_stats(self):
+        """Return the pool size, active and queued requests of the
+        HTTP client.
+        """
+        return self.transport.stats(self.http_client)
+
+    def bulk(self, operation, items, concurrency=10, rate_limit=None):
+        """Return a BulkExecutor calling ``operation`` (e.g. ``'capture'``)
+        with each dict of keyword arguments in ``items``.
+
+        :arg concurrency: Maximum number of concurrent calls.
+        :arg rate_limit: Maximum number of calls started per second.
+        """
+        return BulkExecutor(getattr(self, operation), items, concurrency, rate_limit)
+
     @property
     def headers(self):
         """default headers to be sent on http requests"""
@@ -84,14 +131,32 @@ class BaseRequest(object):
     def _render_template(self, template_name, data_dict):
         """Render a template.
         """
+        self._add_request_data(data_dict)
+        return render.render_template(template_name, data_dict)
+
+    def _add_request_data(self, data_dict):
         data_dict['merchant_id'] = self.merchant_id
 
         if not data_dict.get('request_id'):
             data_dict['request_id'] = unicode(uuid.uuid4())
 
-        template = self.jinja_env.get_template(template_name)
-        xml_request = template.render(data_dict)
-        return spaceless(xml_request)
+    def _render(self, template_name, data_dict):
+        """Render a template, in the executor if offload_render is set.
+        Returns a Future.
+        """
+        if self.executor is None or not self.offload_render:
+            return _resolved(self._render_template(template_name, data_dict))
+
+        self._add_request_data(data_dict)
+        return self.executor.submit(render.render_template, template_name, data_dict)
+
+    def _parse_response(self, response_class, body, **kwargs):
+        """Create the response from the body, in the executor if it has at
+        least offload_threshold bytes. Returns a Future.
+        """
+        if self.executor is not None and len(body) >= self.offload_threshold:
+            return self.executor.submit(response_class, body, **kwargs)
+        return _resolved(response_class(body, **kwargs))
 
     def pretty_xml(self, payload):
         """Try and return the payload as parsed and indented XML. If we fail to parse it,
@@ -103,53 +168,205 @@ class BaseRequest(object):
             body = payload
         return body
 
+    def _get_circuit_breaker(self, url):
+        """Return the CircuitBreaker of the url, or None if disabled.
+        """
+        if self.circuit_breaker_options is None:
+            return None
+
+        circuit_breaker = self.circuit_breakers.get(url)
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker(url, **self.circuit_breaker_options)
+            self.circuit_breakers[url] = circuit_breaker
+        return circuit_breaker
+
+    def _record_call(self, circuit_breaker, trial, start_time, failed):
+        if circuit_breaker is not None:
+            circuit_breaker.record(failed, time.time() - start_time, trial)
+
     @gen.coroutine
-    def fetch(self, xml, url):
-        masked_xml = mask_card_data_from_xml(xml)
+    def fetch(self, xml, url, operation=None, timings=None):
         request = self._get_request(url, xml)
 
-        logger.info(
-            u'URL: {url} - Request: {body}'.format(
-                url=url,
-                body=masked_xml
+        # the payloads are only masked and formatted if they are logged
+        log_payloads = logger.isEnabledFor(logging.INFO) and (
+            self.payload_logging is None or self.payload_logging.sample(operation))
+        if log_payloads:
+            log_start = clock()
+            logger.info(
+                u'URL: {url} - Request: {body}'.format(
+                    url=url,
+                    body=self._log_body(xml)
+                )
             )
-        )
+            if timings is not None:
+                timings.add('log', clock() - log_start)
+
+        # every call allowed by the breaker must record its outcome, or a
+        # half-open breaker would wait for its trial call forever
+        circuit_breaker = self._get_circuit_breaker(url)
+        trial = None
+        if circuit_breaker is not None:
+            trial = circuit_breaker.before_call()
+
+        start_time = time.time()
+        call = states = None
+        if self.instrumentation:
+            call = CallRecord(operation, request.url, request.method, start_time,
+                              len(request.body))
+            states = self._start_call(call)
 
-        with newrelic_external_trace(request.url, request.method):
-            try:
-                response = yield self.http_client.fetch(request)
-            except HTTPError as e:
-                logger.error(
-                    u'Request to "{url}" with body "{body}" ended '
-                    u'with {error}.'.format(
-                        url=url,
-                        body=masked_xml,
-                        error=to_unicode(e.message)
-                    )
-                )
-                if e.code == 599:
-                    raise HTTPTimeoutError(e.code, e.message, e.response)
-                raise
-
-        logger.info(
-            u'Response code: {code} body: {body}'.format(
-                code=response.code,
-                body=mask_card_data_from_xml(
-                    to_unicode(response.body)
+        try:
+            response = yield self.http_client.fetch(request)
+        except HTTPError as e:
+            self._record_call(circuit_breaker, trial, start_time, failed=e.code >= 500)
+            self._log_error(url, xml, e.message)
+            error = e.code == 599 and HTTPTimeoutError(e.code, e.message, e.response) or e
+            if call is not None:
+                self._finish_call(call, states, status=e.code, error=error)
+            if error is not e:
+                raise error
+            raise
+        except IOError as e:
+            self._record_call(circuit_breaker, trial, start_time, failed=True)
+            self._log_error(url, xml, repr(e))
+            if call is not None:
+                self._finish_call(call, states, error=e)
+            raise
+        except Exception as e:
+            self._record_call(circuit_breaker, trial, start_time, failed=True)
+            if call is not None:
+                self._finish_call(call, states, error=e)
+            raise
+
+        self._record_call(circuit_breaker, trial, start_time, failed=False)
+        if timings is not None:
+            timings.add_response(response, time.time() - start_time)
+        if call is not None:
+            self._finish_call(call, states, status=response.code, response=response)
+        if log_payloads:
+            log_start = clock()
+            logger.info(
+                u'Response code: {code} body: {body}'.format(
+                    code=response.code,
+                    body=self._log_body(to_unicode(response.body))
                 )
             )
-        )
+            if timings is not None:
+                timings.add('log', clock() - log_start)
 
         raise gen.Return(response)
 
+    def _start_call(self, call):
+        """Call the start hooks, returning their states"""
+        states = []
+        for instrumentation in self.instrumentation:
+            try:
+                states.append(instrumentation.start(call))
+            except Exception:
+                logger.exception(u'Instrumentation {0!r} failed to start.'.format(instrumentation))
+                states.append(None)
+        return states
+
+    def _finish_call(self, call, states, status=None, response=None, error=None):
+        call.end_time = time.time()
+        call.status = status
+        call.response = response
+        call.error = error
+        for instrumentation, state in zip(self.instrumentation, states):
+            try:
+                instrumentation.finish(call, state)
+            except Exception:
+                logger.exception(u'Instrumentation {0!r} failed to finish.'.format(instrumentation))
+
+    def _log_body(self, body):
+        """Mask the card data of a payload and truncate it"""
+        body = mask_card_data_from_xml(body)
+        if self.payload_logging is not None:
+            body = self.payload_logging.truncate(body)
+        return body
+
+    def _log_error(self, url, xml, error):
+        # errors are never sampled out
+        if logger.isEnabledFor(logging.ERROR):
+            logger.error(
+                u'Request to "{url}" with body "{body}" ended '
+                u'with {error}.'.format(
+                    url=url,
+                    body=self._log_body(xml),
+                    error=to_unicode(error)
+                )
+            )
+
+    def _finish_operation(self, operation, response, timings):
+        """Attach the timings to the response, logging slow calls, and
+        call the complete hooks.
+        """
+        timings.finish()
+        response.timings = timings
+        if self.slow_call_threshold is not None and timings['total'] >= self.slow_call_threshold:
+            logger.warning(u'Slow call to {operation}: {timings}'.format(
+                operation=operation,
+                timings=timings.format()
+            ))
+
+        for instrumentation in self.instrumentation:
+            try:
+                instrumentation.complete(operation, response, timings)
+            except Exception:
+                logger.exception(u'Instrumentation {0!r} failed to complete.'.format(instrumentation))
+
+    def _fetch_with_retry(self, xml, url, retry_policy=None, operation=None, timings=None):
+        """Fetch the url, retrying transient errors according to the given
+        RetryPolicy. Returns a Future.
+        """
+        if retry_policy is None:
+            return self.fetch(xml, url, operation=operation, timings=timings)
+        return self._fetch_retrying(xml, url, retry_policy, operation, timings)
+
+    @gen.coroutine
+    def _fetch_retrying(self, xml, url, retry_policy, operation=None, timings=None):
+        io_loop = IOLoop.current()
+        deadline = None
+        if retry_policy.deadline is not None:
+            deadline = io_loop.time() + retry_policy.deadline
+
+        attempt = 1
+        while True:
+            try:
+                response = yield self.fetch(xml, url, operation=operation, timings=timings)
+            except Exception as e:
+                if not retry_policy.should_retry(e, attempt):
+                    raise
+
+                delay = retry_policy.get_delay(attempt)
+                if deadline is not None and io_loop.time() + delay >= deadline:
+                    raise
+
+                logger.warning(
+                    u'Retrying request to "{url}" in {delay:.3f}s '
+                    u'(attempt {attempt} failed with {error}).'.format(
+                        url=url,
+                        delay=delay,
+                        attempt=attempt,
+                        error=repr(e)
+                    )
+                )
+                yield gen.sleep(delay)
+                attempt += 1
+            else:
+                raise gen.Return(response)
+
 
 class BraspagRequest(BaseRequest):
     """
     Implements Braspag Pagador API (manual version 1.9).
     """
 
-    def __init__(self, merchant_id=None, homologation=False, request_timeout=10):
-        super(BraspagRequest, self).__init__(merchant_id, homologation, request_timeout)
+    def __init__(self, merchant_id=None, homologation=False, request_timeout=10, cache=None,
+                 coalesce_queries=False, lazy_responses=False, compact_transactions=False,
+                 **kwargs):
+        super(BraspagRequest, self).__init__(merchant_id, homologation, request_timeout, **kwargs)
         if homologation:
             self.url = 'https://transactionsandbox.pagador.com.br'
         else:
@@ -159,14 +376,118 @@ class BraspagRequest(BaseRequest):
         self.query_service = '/services/pagadorQuery.asmx'
         self.transaction_service = '/webservice/pagadorTransaction.asmx'
 
-    @gen.coroutine
-    def _request(self, xml, query=False):
-        """Make the http request to Braspag.
+        # optional ResponseCache for the query operations
+        self.cache = cache
+
+        # concurrent identical queries share the same request and response
+        self.coalesce_queries = coalesce_queries
+        self._inflight_queries = {}
+        # bumped by captures, voids and refunds: queries in flight before
+        # are not joined by the ones started after
+        self._query_generation = 0
+
+        # load the transactions and errors of responses on first access
+        self.lazy_responses = lazy_responses
+
+        # store the transactions of responses in TransactionRecord objects
+        # instead of dicts
+        self.compact_transactions = compact_transactions
+
+    QUERY_OPERATIONS = (
+        'get_order_id_by_transaction_id',
+        'get_customer_data',
+        'get_transaction_data',
+        'get_order_data',
+        'get_braspag_order_id_by_order',
+    )
+
+    def _get_retry_policy(self, operation, kwargs):
+        """Return the RetryPolicy for an operation call.
+
+        Queries are idempotent and always retried. Transactions are only
+        retried when the caller asks for it with ``retry=True`` and sends
+        its own ``request_id``, so Braspag can detect the duplicates.
+        """
+        policy = self.retry_policies.get(operation, DEFAULT_RETRY_POLICY)
+        if operation in self.QUERY_OPERATIONS:
+            return policy
+
+        if kwargs.get('retry'):
+            assert kwargs.get('request_id'), '{0} requires a request_id to be retried'.format(operation)
+            return policy
+
+        return None
+
+    def _request(self, xml, query=False, retry_policy=None, operation=None, timings=None):
+        """Make the http request to Braspag. Returns a Future.
         """
         url = self._get_url(query and self.query_service or self.transaction_service)
-        response = yield self.fetch(xml, url)
+        return self._fetch_with_retry(xml, url, retry_policy, operation, timings)
+
+    def _query(self, operation, key, template_name, context, response_class):
+        """Make a Pagador Query request, using the cache if enabled.
+
+        :arg key: ID used to query the data, it identifies the cache entry.
+
+        When ``coalesce_queries`` is enabled, a query made while an identical
+        one (same operation and key) is in flight waits for it and receives
+        the same response object, including its correlation id. Queries made
+        after a capture, void or refund never wait for one started before.
+
+        Returns a Future.
+        """
+        if self.cache is not None:
+            response = self.cache.get(operation, key)
+            if response is not None:
+                return _resolved(response)
+
+        if not self.coalesce_queries:
+            return self._fetch_query(operation, key, template_name, context, response_class)
+
+        inflight_key = (operation, query_key(operation, key), self._query_generation)
+        future = self._inflight_queries.get(inflight_key)
+        if future is None or future.done():
+            future = self._fetch_query(operation, key, template_name, context, response_class)
+            self._inflight_queries[inflight_key] = future
+
+            def forget(future):
+                if self._inflight_queries.get(inflight_key) is future:
+                    del self._inflight_queries[inflight_key]
+            future.add_done_callback(forget)
+
+        return future
+
+    @gen.coroutine
+    def _fetch_query(self, operation, key, template_name, context, response_class):
+        timings = Timings()
+        retry_policy = self._get_retry_policy(operation, context)
+        # responses of queries started before an invalidation are not cached
+        generation = self.cache is not None and self.cache.generation()
+        xml = yield self._render(template_name, context)
+        timings.mark('render')
+        http_response = yield self._request(xml, query=True, retry_policy=retry_policy,
+                                            operation=operation, timings=timings)
+        timings.mark('fetch')
+        response = yield self._parse_response(response_class, http_response.body)
+        timings.mark('parse')
+        self._finish_operation(operation, response, timings)
+
+        if self.cache is not None and response.success:
+            self.cache.set(operation, key, response, _get_transaction_ids(response),
+                           generation=generation)
         raise gen.Return(response)
 
+    def _parse_response(self, response_class, body, **kwargs):
+        if issubclass(response_class, PagadorDictResponse):
+            kwargs['lazy'] = self.lazy_responses
+            kwargs['compact'] = self.compact_transactions
+        return super(BraspagRequest, self)._parse_response(response_class, body, **kwargs)
+
+    def _invalidate_transaction(self, transaction_id):
+        self._query_generation += 1
+        if self.cache is not None:
+            self.cache.invalidate_transaction(transaction_id)
+
     @gen.coroutine
     def authorize(self, **kwargs):
         """Pre-authorize a payment.
@@ -180,6 +501,7 @@ class BraspagRequest(BaseRequest):
         :arg customer_name: User's full name.
         :arg customer_email: User's email address.
         :arg transactions: List of transactions to pre-authorize.
+        :arg retry: Retry transient errors, requires *request_id*. *Default: False*.
         """
         required_keys = ['order_id', 'customer_id', 'customer_name', 'customer_email', 'transactions']
         assert all([kwargs.has_key(k) for k in required_keys]), 'authorize requires all the variables: {0}'.format(required_keys)
@@ -187,8 +509,17 @@ class BraspagRequest(BaseRequest):
         kwargs['transactions'] = [BraspagTransaction(**t) for t in kwargs['transactions']]
         kwargs.update(transaction_type=TransactionType.PRE_AUTHORIZATION)
 
-        response = yield self._request(self._render_template('authorize.xml', kwargs))
-        raise gen.Return(CreditCardAuthorizationResponse(response.body))
+        timings = Timings()
+        retry_policy = self._get_retry_policy('authorize', kwargs)
+        xml = yield self._render('authorize.xml', kwargs)
+        timings.mark('render')
+        response = yield self._request(xml, retry_policy=retry_policy, operation='authorize',
+                                       timings=timings)
+        timings.mark('fetch')
+        response = yield self._parse_response(CreditCardAuthorizationResponse, response.body)
+        timings.mark('parse')
+        self._finish_operation('authorize', response, timings)
+        raise gen.Return(response)
 
     @gen.coroutine
     def refund(self, **kwargs):
@@ -200,13 +531,17 @@ class BraspagRequest(BaseRequest):
         :arg transation_id: Braspag's transaction ID.
         :arg amount: The amount that should be refunded, must be <= the total
                      transaction amount.
+        :arg retry: Retry transient errors, requires *request_id*. *Default: False*.
         """
         assert is_valid_guid(kwargs.get('transaction_id')), 'Transaction ID invalido'
         assert isinstance(kwargs.get('amount', None), int), 'Amount is required and must be int'
 
-        kwargs['type'] = 'Refund'
-        response = yield self._request(self._render_template('base.xml', kwargs))
-        raise gen.Return(CreditCardRefundResponse(response.body))
+        kwargs['transactions'] = [{
+            'transaction_id': kwargs['transaction_id'],
+            'amount': kwargs['amount'],
+        }]
+        response = yield self._update_transactions('refund', 'Refund', CreditCardRefundResponse, kwargs)
+        raise gen.Return(response)
 
     @gen.coroutine
     def capture(self, **kwargs):
@@ -217,13 +552,17 @@ class BraspagRequest(BaseRequest):
 
         :arg transaction_id: Previously authorized transaction ID.
         :arg amount: Amount to be captured, in int.
+        :arg retry: Retry transient errors, requires *request_id*. *Default: False*.
         """
         assert is_valid_guid(kwargs.get('transaction_id')), 'Transaction ID invalido'
         assert isinstance(kwargs.get('amount', None), int), 'Amount is required and must be int'
 
-        kwargs['type'] = 'Capture'
-        response = yield self._request(self._render_template('base.xml', kwargs))
-        raise gen.Return(CreditCardCaptureResponse(response.body))
+        kwargs['transactions'] = [{
+            'transaction_id': kwargs['transaction_id'],
+            'amount': kwargs['amount'],
+        }]
+        response = yield self._update_transactions('capture', 'Capture', CreditCardCaptureResponse, kwargs)
+        raise gen.Return(response)
 
     @gen.coroutine
     def void(self, **kwargs):
@@ -234,13 +573,93 @@ class BraspagRequest(BaseRequest):
 
         :arg transaction_id: ID of the transaction to be voided.
         :arg amount: Amount of the transaction, in int.
+        :arg retry: Retry transient errors, requires *request_id*. *Default: False*.
         """
         assert is_valid_guid(kwargs.get('transaction_id')), 'Transaction ID invalido'
         assert isinstance(kwargs.get('amount', None), int), 'Amount is required and must be int'
 
-        kwargs['type'] = 'Void'
-        response = yield self._request(self._render_template('base.xml', kwargs))
-        raise gen.Return(CreditCardCancelResponse(response.body))
+        kwargs['transactions'] = [{
+            'transaction_id': kwargs['transaction_id'],
+            'amount': kwargs['amount'],
+        }]
+        response = yield self._update_transactions('void', 'Void', CreditCardCancelResponse, kwargs)
+        raise gen.Return(response)
+
+    @gen.coroutine
+    def refund_many(self, **kwargs):
+        """Refund several transactions in a single request.
+
+        :arg transactions: List of (transaction_id, amount) pairs.
+        :arg retry: Retry transient errors, requires *request_id*. *Default: False*.
+
+        The result of each transaction is in the ``transactions`` list of the
+        response.
+        """
+        kwargs['transactions'] = self._get_transactions_pairs(kwargs)
+        response = yield self._update_transactions('refund_many', 'Refund',
+                                                   CreditCardRefundResponse, kwargs)
+        raise gen.Return(response)
+
+    @gen.coroutine
+    def capture_many(self, **kwargs):
+        """Capture several previously-authorized transactions in a single request.
+
+        :arg transactions: List of (transaction_id, amount) pairs.
+        :arg retry: Retry transient errors, requires *request_id*. *Default: False*.
+
+        The result of each transaction is in the ``transactions`` list of the
+        response.
+        """
+        kwargs['transactions'] = self._get_transactions_pairs(kwargs)
+        response = yield self._update_transactions('capture_many', 'Capture',
+                                                   CreditCardCaptureResponse, kwargs)
+        raise gen.Return(response)
+
+    @gen.coroutine
+    def void_many(self, **kwargs):
+        """Void/cancel several transactions in a single request.
+
+        :arg transactions: List of (transaction_id, amount) pairs.
+        :arg retry: Retry transient errors, requires *request_id*. *Default: False*.
+
+        The result of each transaction is in the ``transactions`` list of the
+        response.
+        """
+        kwargs['transactions'] = self._get_transactions_pairs(kwargs)
+        response = yield self._update_transactions('void_many', 'Void',
+                                                   CreditCardCancelResponse, kwargs)
+        raise gen.Return(response)
+
+    def _get_transactions_pairs(self, kwargs):
+        assert kwargs.get('transactions'), 'transactions is required'
+
+        transactions = []
+        for transaction_id, amount in kwargs['transactions']:
+            assert is_valid_guid(transaction_id), 'Transaction ID invalido'
+            assert isinstance(amount, int), 'Amount must be int'
+            transactions.append({'transaction_id': transaction_id, 'amount': amount})
+        return transactions
+
+    @gen.coroutine
+    def _update_transactions(self, operation, type, response_class, kwargs):
+        """Capture, void or refund the transactions listed in kwargs.
+        """
+        timings = Timings()
+        kwargs['type'] = type
+        retry_policy = self._get_retry_policy(operation, kwargs)
+        xml = yield self._render('base.xml', kwargs)
+        timings.mark('render')
+        try:
+            response = yield self._request(xml, retry_policy=retry_policy, operation=operation,
+                                           timings=timings)
+        finally:
+            for transaction in kwargs['transactions']:
+                self._invalidate_transaction(transaction['transaction_id'])
+        timings.mark('fetch')
+        response = yield self._parse_response(response_class, response.body)
+        timings.mark('parse')
+        self._finish_operation(operation, response, timings)
+        raise gen.Return(response)
 
     @gen.coroutine
     def get_order_id_by_transaction_id(self, **kwargs):
@@ -258,9 +677,9 @@ class BraspagRequest(BaseRequest):
             'request_id': kwargs.get('request_id')
         }
 
-        response = yield self._request(self._render_template('get_braspag_order_id.xml',
-                                                    context), query=True)
-        raise gen.Return(BraspagOrderIdResponse(response.body))
+        response = yield self._query('get_order_id_by_transaction_id', context['transaction_id'], 'get_braspag_order_id.xml',
+                                     context, BraspagOrderIdResponse)
+        raise gen.Return(response)
 
     @gen.coroutine
     def get_customer_data(self, **kwargs):
@@ -278,9 +697,9 @@ class BraspagRequest(BaseRequest):
             'request_id': kwargs.get('request_id')
         }
 
-        response = yield self._request(self._render_template('get_customer_data.xml',
-                                                    context), query=True)
-        raise gen.Return(CustomerDataResponse(response.body))
+        response = yield self._query('get_customer_data', context['order_id'], 'get_customer_data.xml',
+                                     context, CustomerDataResponse)
+        raise gen.Return(response)
 
     @gen.coroutine
     def get_transaction_data(self, **kwargs):
@@ -298,9 +717,9 @@ class BraspagRequest(BaseRequest):
             'request_id': kwargs.get('request_id')
         }
 
-        response = yield self._request(self._render_template('get_transaction_data.xml',
-                                                    context), query=True)
-        raise gen.Return(TransactionDataResponse(response.body))
+        response = yield self._query('get_transaction_data', context['transaction_id'], 'get_transaction_data.xml',
+                                     context, TransactionDataResponse)
+        raise gen.Return(response)
 
     @gen.coroutine
     def get_order_data(self, **kwargs):
@@ -319,9 +738,9 @@ class BraspagRequest(BaseRequest):
             'request_id': kwargs.get('request_id')
         }
 
-        response = yield self._request(self._render_template('get_braspag_order_data.xml',
-                                                    context), query=True)
-        raise gen.Return(BraspagOrderDataResponse(response.body))
+        response = yield self._query('get_order_data', context['order_id'], 'get_braspag_order_data.xml',
+                                     context, BraspagOrderDataResponse)
+        raise gen.Return(response)
 
     @gen.coroutine
     def get_braspag_order_id_by_order(self, **kwargs):
@@ -340,9 +759,33 @@ class BraspagRequest(BaseRequest):
             'request_id': kwargs.get('request_id')
         }
 
-        response = yield self._request(self._render_template('get_braspag_order_id_by_order.xml',
-                                                    context), query=True)
-        raise gen.Return(BraspagOrderIdDataResponse(response.body))
+        response = yield self._query('get_braspag_order_id_by_order', context['order_id'], 'get_braspag_order_id_by_order.xml',
+                                     context, BraspagOrderIdDataResponse)
+        raise gen.Return(response)
+
+
+def _resolved(value):
+    """Return a Future already resolved to value"""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _get_transaction_ids(response):
+    """Return the Braspag transaction ids found in a query response"""
+    transaction_ids = set()
+    if getattr(response, 'transaction_id', None):
+        transaction_ids.add(response.transaction_id)
+
+    transactions = list(getattr(response, 'transactions', None) or [])
+    transactions.extend(getattr(response, 'orders', None) or [])
+    if getattr(response, 'transaction', None):
+        transactions.append(response.transaction)
+
+    for transaction in transactions:
+        if transaction.get('braspag_transaction_id'):
+            transaction_ids.add(transaction['braspag_transaction_id'])
+    return transaction_ids
 
 
 class BraspagTransaction(object):
@@ -441,8 +884,8 @@ class ProtectedCardRequest(BaseRequest):
     Implements Braspag Cartão Protegido API (manual version 2.1).
     """
 
-    def __init__(self, merchant_id=None, homologation=False, request_timeout=10):
-        super(ProtectedCardRequest, self).__init__(merchant_id, homologation, request_timeout)
+    def __init__(self, merchant_id=None, homologation=False, request_timeout=10, **kwargs):
+        super(ProtectedCardRequest, self).__init__(merchant_id, homologation, request_timeout, **kwargs)
         if homologation:
             self.url = 'https://cartaoprotegidosandbox.braspag.com.br'
             self.protected_card_service = '/V2/cartaoprotegido.asmx'
@@ -450,13 +893,11 @@ class ProtectedCardRequest(BaseRequest):
             self.url = 'https://cartaoprotegido.braspag.com.br'
             self.protected_card_service = '/services/v2/cartaoprotegido.asmx'
 
-    @gen.coroutine
-    def _request(self, xml):
-        """Make the http request to Braspag.
+    def _request(self, xml, operation=None, timings=None):
+        """Make the http request to Braspag. Returns a Future.
         """
         url = self._get_url(self.protected_card_service)
-        response = yield self.fetch(xml, url)
-        raise gen.Return(response)
+        return self.fetch(xml, url, operation=operation, timings=timings)
 
     @gen.coroutine
     def add_card(self, **kwargs):
@@ -475,8 +916,15 @@ class ProtectedCardRequest(BaseRequest):
         required_keys = ['customer_identification', 'customer_name', 'card_holder', 'card_number', 'card_expiration']
         assert all([kwargs.has_key(k) for k in required_keys]), 'add_card requires all the variables: {0}'.format(required_keys)
 
-        response = yield self._request(self._render_template('add_card.xml', kwargs))
-        raise gen.Return(AddCardResponse(response.body))
+        timings = Timings()
+        xml = yield self._render('add_card.xml', kwargs)
+        timings.mark('render')
+        response = yield self._request(xml, operation='add_card', timings=timings)
+        timings.mark('fetch')
+        response = yield self._parse_response(AddCardResponse, response.body)
+        timings.mark('parse')
+        self._finish_operation('add_card', response, timings)
+        raise gen.Return(response)
 
     @gen.coroutine
     def invalidate_card(self, **kwargs):
@@ -490,8 +938,15 @@ class ProtectedCardRequest(BaseRequest):
         """
         assert kwargs.has_key('just_click_key'), 'invalidate_card requires just_click_key variable'
 
-        response = yield self._request(self._render_template('invalidate_card.xml', kwargs))
-        raise gen.Return(InvalidateCardResponse(response.body))
+        timings = Timings()
+        xml = yield self._render('invalidate_card.xml', kwargs)
+        timings.mark('render')
+        response = yield self._request(xml, operation='invalidate_card', timings=timings)
+        timings.mark('fetch')
+        response = yield self._parse_response(InvalidateCardResponse, response.body)
+        timings.mark('parse')
+        self._finish_operation('invalidate_card', response, timings)
+        raise gen.Return(response)
 
     @gen.coroutine
     def get_card(self, **kwargs):
@@ -505,5 +960,12 @@ class ProtectedCardRequest(BaseRequest):
         """
         assert kwargs.has_key('just_click_key'), 'get_card requires just_click_key variable'
 
-        response = yield self._request(self._render_template('get_card.xml', kwargs))
-        raise gen.Return(GetCardResponse(response.body))
+        timings = Timings()
+        xml = yield self._render('get_card.xml', kwargs)
+        timings.mark('render')
+        response = yield self._request(xml, operation='get_card', timings=timings)
+        timings.mark('fetch')
+        response = yield self._parse_response(GetCardResponse, response.body)
+        timings.mark('parse')
+        self._finish_operation('get_card', response, timings)
+        raise gen.Return(response)
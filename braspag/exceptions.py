@@ -15,4 +15,10 @@ class HTTPTimeoutError(HTTPError):
     Timeout Exception
     """
     pass
-    
\ No newline at end of file
+    
+
+class CircuitOpenError(BraspagException):
+    """
+    Raised without calling Braspag while the circuit of the endpoint is open
+    """
+    pass
@@ -0,0 +1,181 @@
+# -*- encoding: utf-8 -*-
+"""Export the current status of Braspag transactions as JSON lines::
+
+    braspag-export --merchant-id F9B44052-... ids.txt > status.jsonl
+
+The input has one Braspag transaction id per line, or order ids with
+``--orders``, and is read from stdin without a file name. Each result is
+written as one JSON object with the ``id`` queried and either the
+response data or an ``error``.
+
+With ``--checkpoint``, the ids successfully exported are appended to the
+given file and skipped when the command runs again, so an interrupted
+export can be resumed by repeating it, appending to the same output.
+Failed ids are not checkpointed and are queried again on resume.
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from .core import BraspagRequest
+from .response import TransactionRecord
+from .transport import Transport
+
+
+# operation -> keyword argument receiving the id
+OPERATIONS = {
+    'get_transaction_data': 'transaction_id',
+    'get_order_data': 'order_id',
+}
+
+RESPONSE_FIELDS = ('success', 'correlation_id', 'errors', 'transaction', 'transactions')
+
+
+def read_ids(lines, skip=()):
+    """Yield the ids of the lines, ignoring blank lines and the ids in
+    ``skip`` (lower case).
+    """
+    for line in lines:
+        id_ = line.strip()
+        if id_ and id_.lower() not in skip:
+            yield id_
+
+
+def load_checkpoint(path):
+    """Return the ids, in lower case, listed in a checkpoint file"""
+    if not os.path.exists(path):
+        return set()
+
+    with open(path) as f:
+        return set(id_.lower() for id_ in read_ids(f))
+
+
+def format_result(id_, result):
+    """Return the JSON line of a response or of the exception raised"""
+    if isinstance(result, Exception):
+        data = {'error': u'{0}: {1}'.format(type(result).__name__, result)}
+    else:
+        data = dict((field, getattr(result, field)) for field in RESPONSE_FIELDS
+                    if hasattr(result, field))
+    data['id'] = id_
+    return json.dumps(data, default=_to_json, sort_keys=True)
+
+
+def _to_json(value):
+    if isinstance(value, TransactionRecord):
+        return value.to_dict()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError('{0!r} is not JSON serializable'.format(value))
+
+
+@gen.coroutine
+def export(request, operation, ids, output, checkpoint=None, concurrency=10, rate_limit=None):
+    """Query each id and write the results to ``output``, as they complete.
+
+    :arg checkpoint: File object where the ids are appended once their
+                     result has been written.
+
+    Resolves to the number of (results, errors).
+    """
+    key = OPERATIONS[operation]
+    items = ({key: id_} for id_ in ids)
+    bulk = request.bulk(operation, items, concurrency=concurrency, rate_limit=rate_limit)
+
+    results = errors = 0
+    while (yield bulk.fetch_next()):
+        item, result = bulk.next_result()
+        output.write(format_result(item[key], result) + '\n')
+        output.flush()
+
+        if isinstance(result, Exception):
+            errors += 1
+        else:
+            results += 1
+            if checkpoint is not None:
+                checkpoint.write(item[key] + '\n')
+                checkpoint.flush()
+
+    raise gen.Return((results, errors))
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='braspag-export',
+        description='Export the status of Braspag transactions as JSON lines.',
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help='file with one id per line, stdin by default')
+    parser.add_argument('--merchant-id', default=os.environ.get('BRASPAG_MERCHANT_ID'),
+                        help='defaults to the BRASPAG_MERCHANT_ID environment variable')
+    parser.add_argument('--homologation', action='store_true',
+                        help='use the Braspag sandbox')
+    parser.add_argument('--orders', action='store_true',
+                        help='the ids are order ids, queried with get_order_data')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='maximum number of concurrent queries (default: 10)')
+    parser.add_argument('--rate-limit', type=float,
+                        help='maximum number of queries started per second')
+    parser.add_argument('--timeout', type=float, default=10,
+                        help='request timeout in seconds (default: 10)')
+    parser.add_argument('--checkpoint',
+                        help='file of the exported ids, skipped when run again')
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if not args.merchant_id:
+        parser.error('--merchant-id or BRASPAG_MERCHANT_ID is required')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+
+    logging.basicConfig(level=logging.WARNING)
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    operation = args.orders and 'get_order_data' or 'get_transaction_data'
+
+    request = BraspagRequest(
+        args.merchant_id,
+        homologation=args.homologation,
+        request_timeout=args.timeout,
+        transport=Transport(max_clients=args.concurrency),
+    )
+
+    skip = set()
+    checkpoint = None
+    if args.checkpoint:
+        skip = load_checkpoint(args.checkpoint)
+        checkpoint = open(args.checkpoint, 'a')
+
+    input_file = args.input == '-' and stdin or open(args.input)
+    try:
+        results, errors = IOLoop.current().run_sync(lambda: export(
+            request, operation, read_ids(input_file, skip), stdout,
+            checkpoint=checkpoint,
+            concurrency=args.concurrency,
+            rate_limit=args.rate_limit,
+        ))
+    finally:
+        if input_file is not stdin:
+            input_file.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    print(u'{0} exported, {1} failed, {2} previously exported'.format(results, errors, len(skip)),
+          file=sys.stderr)
+    return errors and 1 or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
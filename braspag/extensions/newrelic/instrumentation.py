@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from newrelic.agent import current_transaction, ExternalTrace
+
+from braspag.instrumentation import Instrumentation
+
+
+class NewRelicInstrumentation(Instrumentation):
+    """Map each call to Braspag to a New Relic external trace::
+
+        BraspagRequest(MERCHANT_ID, instrumentation=[NewRelicInstrumentation()])
+
+    Requires the ``newrelic`` extra (``pip install braspag[newrelic]``).
+    """
+
+    def start(self, call):
+        transaction = current_transaction()
+        if transaction is None:
+            return None
+
+        trace = ExternalTrace(transaction, 'tornado.httpclient', call.url, call.method)
+        trace.__enter__()
+        return trace
+
+    def finish(self, call, state):
+        if state is None:
+            return
+
+        if call.error is None:
+            state.__exit__(None, None, None)
+        else:
+            state.__exit__(type(call.error), call.error, None)
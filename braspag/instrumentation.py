@@ -0,0 +1,74 @@
+# -*- encoding: utf-8 -*-
+"""Hooks called around each HTTP call made to Braspag::
+
+    class StatsdInstrumentation(Instrumentation):
+        def finish(self, call, state):
+            statsd.timing('braspag.' + call.operation, call.duration * 1000)
+
+    BraspagRequest(MERCHANT_ID, instrumentation=[StatsdInstrumentation()])
+
+See braspag.extensions.newrelic for the New Relic adapter.
+"""
+from __future__ import absolute_import
+
+
+class CallRecord(object):
+    """Describe one HTTP call, each retry attempt being a call of its own.
+
+    :arg operation: Name of the operation (e.g. ``'capture'``).
+    :arg url: URL requested.
+    :arg method: HTTP method.
+    :arg start_time: ``time.time()`` when the call started.
+    :arg request_size: Bytes of the request body.
+
+    The other attributes are set before ``Instrumentation.finish``:
+    ``end_time``, ``status`` (the HTTP status code, None if no response
+    was received), ``response`` (the HTTPResponse, None on errors) and
+    ``error`` (the exception raised, None on success).
+    """
+
+    __slots__ = ('operation', 'url', 'method', 'start_time', 'request_size',
+                 'end_time', 'status', 'response', 'error')
+
+    def __init__(self, operation, url, method, start_time, request_size=0):
+        self.operation = operation
+        self.url = url
+        self.method = method
+        self.start_time = start_time
+        self.request_size = request_size
+        self.end_time = None
+        self.status = None
+        self.response = None
+        self.error = None
+
+    @property
+    def duration(self):
+        """Seconds spent on the call, None while it is running"""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def __repr__(self):
+        return '<CallRecord {0} {1} status={2}>'.format(self.operation, self.url, self.status)
+
+
+class Instrumentation(object):
+    """Base class of the instrumentations given to a request object.
+
+    Exceptions raised by the hooks are logged and never reach the caller.
+    """
+
+    def start(self, call):
+        """Called with the CallRecord before the request is sent. The
+        returned value is given back to ``finish``.
+        """
+
+    def finish(self, call, state):
+        """Called with the completed CallRecord and the value returned by
+        ``start``.
+        """
+
+    def complete(self, operation, response, timings):
+        """Called with the parsed response of an operation and its
+        timings, once all its calls are finished.
+        """
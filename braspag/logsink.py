@@ -0,0 +1,132 @@
+# -*- encoding: utf-8 -*-
+"""Logging that does not block the IOLoop.
+
+QueueLogHandler hands the records over to a background thread, which
+writes them to the real handlers::
+
+    from braspag import logsink
+    logsink.install_queue_handler(logging.getLogger())
+
+PayloadLogging limits the request and response payloads logged by
+BaseRequest.fetch at INFO level::
+
+    BraspagRequest(MERCHANT_ID, payload_logging=PayloadLogging(
+        max_body_size=4096,
+        sample_rates={'get_transaction_data': 0.01},
+    ))
+"""
+from __future__ import absolute_import
+
+import logging
+import os
+import Queue
+import random
+import threading
+
+
+_STOP = object()
+
+
+class QueueLogHandler(logging.Handler):
+    """Put the records in a bounded queue, written to ``handlers`` by a
+    background thread. Records arriving while the queue is full are
+    dropped and counted in ``dropped``, so emitting never blocks. A forked
+    process starts its own thread and queue on its first record.
+
+    :arg handlers: Handlers writing the records.
+    :arg max_size: Maximum number of records waiting in the queue.
+    """
+
+    def __init__(self, handlers, max_size=10000, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.handlers = list(handlers)
+        self.max_size = max_size
+        self.dropped = 0
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self.queue = Queue.Queue(self.max_size)
+        self._thread = threading.Thread(target=self._write, name='braspag-log-sink')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def prepare(self, record):
+        """Format the message and the exception now, since their arguments
+        may change before the record is written.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        # threads do not survive a fork, and the records queued by the
+        # parent are its own to write
+        if self._pid != os.getpid():
+            self._start()
+
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _write(self):
+        while True:
+            record = self.queue.get()
+            if record is _STOP:
+                break
+
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def close(self):
+        """Write the queued records and stop the thread"""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+        logging.Handler.close(self)
+
+
+def install_queue_handler(logger, max_size=10000):
+    """Replace the handlers of ``logger`` by a QueueLogHandler writing to
+    them, and return it.
+    """
+    handler = QueueLogHandler(logger.handlers, max_size)
+    for target in handler.handlers:
+        logger.removeHandler(target)
+    logger.addHandler(handler)
+    return handler
+
+
+class PayloadLogging(object):
+    """Which request and response payloads are logged, and how much of
+    them. Errors are always logged, whatever the sampling.
+
+    :arg max_body_size: Maximum number of characters logged of each
+                        payload, after masking the card data.
+    :arg sample_rate: Fraction of the calls with their payloads logged.
+    :arg sample_rates: Dict of sample rates by operation name (e.g.
+                       ``'capture'``), overriding ``sample_rate``.
+    """
+
+    def __init__(self, max_body_size=None, sample_rate=1.0, sample_rates=None, random=random.random):
+        self.max_body_size = max_body_size
+        self.sample_rate = sample_rate
+        self.sample_rates = sample_rates or {}
+        self.random = random
+
+    def sample(self, operation):
+        """Whether the payloads of this call should be logged"""
+        rate = self.sample_rates.get(operation, self.sample_rate)
+        return rate >= 1 or self.random() < rate
+
+    def truncate(self, body):
+        if self.max_body_size is None or len(body) <= self.max_body_size:
+            return body
+        return u'{0}... ({1} characters)'.format(body[:self.max_body_size], len(body))
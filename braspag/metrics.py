@@ -0,0 +1,293 @@
+# -*- encoding: utf-8 -*-
+"""Latency histograms and counters by operation, kept in memory::
+
+    metrics = Metrics()
+    braspag = BraspagRequest(MERCHANT_ID, instrumentation=[metrics])
+    protected_card = ProtectedCardRequest(MERCHANT_ID, instrumentation=[metrics])
+
+    metrics.snapshot()['capture']['latency']['p99']
+
+    app = Application([
+        (r'/metrics', MetricsHandler, {'metrics': metrics}),
+    ])
+
+The latency and the outcomes timeout, http_error and connection_error are
+recorded for each HTTP call, retries included. The outcomes success and
+braspag_error (with the Braspag error codes) are recorded once per
+operation, from its parsed response.
+"""
+from __future__ import absolute_import
+
+import threading
+
+from tornado.web import RequestHandler
+
+from .exceptions import HTTPTimeoutError
+from .instrumentation import Instrumentation
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+QUANTILES = (('p50', 0.5), ('p99', 0.99), ('p999', 0.999))
+
+
+class Histogram(object):
+    """HDR-style histogram of positive integers, with a relative error
+    below ``1 / 2 ** (precision_bits - 1)``.
+
+    Values below ``2 ** precision_bits`` have a bucket of their own and
+    every power of two above it is split in ``2 ** (precision_bits - 1)``
+    buckets. Only the buckets used are stored.
+    """
+
+    def __init__(self, precision_bits=7):
+        assert precision_bits >= 2, 'precision_bits must be at least 2'
+        self.precision_bits = precision_bits
+        self.sub_buckets = 1 << precision_bits
+        self.half = self.sub_buckets >> 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return self.sub_buckets + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _highest_value(self, index):
+        """Return the highest value counted in the bucket"""
+        if index < self.sub_buckets:
+            return index
+        shift, sub_bucket = divmod(index - self.sub_buckets, self.half)
+        shift += 1
+        return ((sub_bucket + self.half + 1) << shift) - 1
+
+    def record(self, value):
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, quantile):
+        """Return the value below or at which ``quantile`` (0 to 1) of the
+        values are, None if the histogram is empty.
+        """
+        if not self.count:
+            return None
+
+        rank = max(1, int(round(quantile * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_value(index), self.max)
+
+
+class OperationMetrics(object):
+
+    def __init__(self, precision_bits):
+        self.latency = Histogram(precision_bits)
+        self.outcomes = {}
+        self.error_codes = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.in_flight = 0
+
+    def count(self, counts, key):
+        counts[key] = counts.get(key, 0) + 1
+
+    def snapshot(self):
+        latency = {
+            'count': self.latency.count,
+            'sum': _to_seconds(self.latency.total),
+            'min': _to_seconds(self.latency.min),
+            'max': _to_seconds(self.latency.max),
+        }
+        for name, quantile in QUANTILES:
+            latency[name] = _to_seconds(self.latency.percentile(quantile))
+
+        return {
+            'latency': latency,
+            'outcomes': dict(self.outcomes),
+            'error_codes': dict(self.error_codes),
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'in_flight': self.in_flight,
+        }
+
+
+class Metrics(Instrumentation):
+    """Instrumentation keeping the metrics of the operations. It may be
+    shared by several request objects.
+
+    :arg precision_bits: Precision of the latency histograms, see
+                         Histogram. The latencies are recorded in
+                         microseconds.
+    """
+
+    def __init__(self, precision_bits=7):
+        self.precision_bits = precision_bits
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def _get(self, operation):
+        metrics = self.operations.get(operation)
+        if metrics is None:
+            metrics = self.operations[operation] = OperationMetrics(self.precision_bits)
+        return metrics
+
+    def start(self, call):
+        with self._lock:
+            metrics = self._get(call.operation)
+            metrics.in_flight += 1
+            metrics.bytes_sent += call.request_size
+
+    def finish(self, call, state):
+        with self._lock:
+            metrics = self._get(call.operation)
+            metrics.in_flight -= 1
+            metrics.latency.record(max(0, int(call.duration * 1000000)))
+            if call.response is not None:
+                metrics.bytes_received += len(call.response.body or b'')
+
+            if isinstance(call.error, HTTPTimeoutError):
+                metrics.count(metrics.outcomes, 'timeout')
+            elif call.status is not None and call.error is not None:
+                metrics.count(metrics.outcomes, 'http_error')
+            elif call.error is not None:
+                metrics.count(metrics.outcomes, 'connection_error')
+
+    def complete(self, operation, response, timings):
+        with self._lock:
+            metrics = self._get(operation)
+            if response.success:
+                metrics.count(metrics.outcomes, 'success')
+                return
+
+            metrics.count(metrics.outcomes, 'braspag_error')
+            for error in response.errors:
+                metrics.count(metrics.error_codes, _get_error_code(error))
+
+    def snapshot(self):
+        """Return the metrics of each operation (e.g. ``'capture'``)::
+
+            {'capture': {
+                'latency': {'count': 2, 'sum': 0.5, 'min': 0.2, 'max': 0.3,
+                            'p50': 0.2, 'p99': 0.3, 'p999': 0.3},
+                'outcomes': {'success': 1, 'timeout': 1},
+                'error_codes': {},
+                'bytes_sent': 1024,
+                'bytes_received': 512,
+                'in_flight': 0,
+            }}
+
+        The latencies are in seconds.
+        """
+        with self._lock:
+            return dict((operation, metrics.snapshot())
+                        for operation, metrics in self.operations.items())
+
+    def render_prometheus(self, prefix='braspag'):
+        """Return the metrics in the Prometheus text format"""
+        return render_prometheus(self.snapshot(), prefix)
+
+
+def render_prometheus(snapshot, prefix='braspag'):
+    """Render a Metrics snapshot in the Prometheus text format"""
+    lines = []
+
+    def family(name, type_, help_):
+        lines.append(u'# HELP {0}_{1} {2}'.format(prefix, name, help_))
+        lines.append(u'# TYPE {0}_{1} {2}'.format(prefix, name, type_))
+
+    def sample(name, labels, value):
+        lines.append(u'{0}_{1}{{{2}}} {3}'.format(prefix, name, _format_labels(labels), _format_value(value)))
+
+    operations = sorted(snapshot)
+
+    family('request_duration_seconds', 'summary', u'Duration of the HTTP calls to Braspag.')
+    for operation in operations:
+        latency = snapshot[operation]['latency']
+        for name, quantile in QUANTILES:
+            if latency[name] is not None:
+                sample('request_duration_seconds', [('operation', operation), ('quantile', quantile)],
+                       latency[name])
+        sample('request_duration_seconds_sum', [('operation', operation)], latency['sum'])
+        sample('request_duration_seconds_count', [('operation', operation)], latency['count'])
+
+    family('requests_total', 'counter', u'Outcomes of the calls to Braspag.')
+    for operation in operations:
+        for outcome, count in sorted(snapshot[operation]['outcomes'].items()):
+            sample('requests_total', [('operation', operation), ('outcome', outcome)], count)
+
+    family('errors_total', 'counter', u'Error codes returned by Braspag.')
+    for operation in operations:
+        for code, count in sorted(snapshot[operation]['error_codes'].items()):
+            sample('errors_total', [('operation', operation), ('code', code)], count)
+
+    family('request_bytes_total', 'counter', u'Bytes sent to Braspag.')
+    for operation in operations:
+        sample('request_bytes_total', [('operation', operation)], snapshot[operation]['bytes_sent'])
+
+    family('response_bytes_total', 'counter', u'Bytes received from Braspag.')
+    for operation in operations:
+        sample('response_bytes_total', [('operation', operation)], snapshot[operation]['bytes_received'])
+
+    family('in_flight_requests', 'gauge', u'HTTP calls to Braspag in progress.')
+    for operation in operations:
+        sample('in_flight_requests', [('operation', operation)], snapshot[operation]['in_flight'])
+
+    return u'\n'.join(lines) + u'\n'
+
+
+class MetricsHandler(RequestHandler):
+    """Serve the metrics in the Prometheus text format"""
+
+    def initialize(self, metrics, prefix='braspag'):
+        self.metrics = metrics
+        self.prefix = prefix
+
+    def get(self):
+        self.set_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+        self.write(self.metrics.render_prometheus(self.prefix).encode('utf-8'))
+
+
+def _get_error_code(error):
+    # PagadorResponse errors are (code, message) pairs, the other
+    # responses use dicts
+    if isinstance(error, dict):
+        code = error.get('error_code')
+    else:
+        code = error[0]
+    if code is None:
+        return None
+    return unicode(code)
+
+
+def _to_seconds(microseconds):
+    if microseconds is None:
+        return None
+    return microseconds / 1000000.0
+
+
+def _format_labels(labels):
+    return u','.join(u'{0}="{1}"'.format(name, _escape(value)) for name, value in labels)
+
+
+def _escape(value):
+    if value is None:
+        value = u''
+    return unicode(value).replace(u'\\', u'\\\\').replace(u'"', u'\\"').replace(u'\n', u'\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return unicode(value)
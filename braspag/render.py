@@ -0,0 +1,122 @@
+# -*- encoding: utf-8 -*-
+"""Process-wide Jinja environment used to render the SOAP requests.
+
+Templates are compiled once, on first use, and never checked for changes
+on disk. Their indentation and line breaks are removed when they are
+loaded, so rendering already produces the compact XML sent to Braspag.
+The fixed-shape requests skip Jinja altogether, see braspag.serializer.
+Compiled templates can also be shipped as python modules::
+
+    from braspag import render
+    render.compile_templates('/opt/app/braspag_templates')
+
+    # on startup
+    render.configure(modules_path='/opt/app/braspag_templates')
+"""
+from __future__ import absolute_import
+
+import jinja2
+
+from .serializer import FIXED_TEMPLATES
+from .serializer import FixedTemplate
+from .utils import spaceless
+
+
+_environment = None
+_templates = {}
+_fixed_templates = {}
+_fast_templates = True
+
+
+class SpacelessLoader(jinja2.BaseLoader):
+    """Wrap a loader, stripping every line of the template sources and
+    joining them, as utils.spaceless does with the rendered XML.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = self.loader.get_source(environment, template)
+        return spaceless(source), filename, uptodate
+
+    def list_templates(self):
+        return self.loader.list_templates()
+
+
+def create_environment(modules_path=None):
+    """Return a new Jinja environment for the package templates.
+
+    :arg modules_path: Directory with templates precompiled by
+                       compile_templates(). Templates missing from it are
+                       loaded from the package.
+    """
+    loader = SpacelessLoader(jinja2.PackageLoader('braspag'))
+    if modules_path is not None:
+        loader = jinja2.ChoiceLoader([jinja2.ModuleLoader(modules_path), loader])
+
+    return jinja2.Environment(
+        autoescape=True,
+        auto_reload=False,
+        loader=loader,
+    )
+
+
+def configure(modules_path=None, fast_templates=True):
+    """Replace the shared environment, see create_environment().
+
+    :arg fast_templates: Render the fixed-shape templates with
+                         serializer.FixedTemplate.
+    """
+    global _environment, _fast_templates
+    _environment = create_environment(modules_path)
+    _fast_templates = fast_templates
+    _templates.clear()
+    _fixed_templates.clear()
+
+
+def get_environment():
+    if _environment is None:
+        configure()
+    return _environment
+
+
+def get_template(template_name):
+    """Return the compiled template, loading it only once"""
+    template = _templates.get(template_name)
+    if template is None:
+        template = get_environment().get_template(template_name)
+        _templates[template_name] = template
+    return template
+
+
+def get_fixed_template(template_name):
+    """Return the FixedTemplate of a template, or None if it has none"""
+    fixed_template = _fixed_templates.get(template_name)
+    if fixed_template is None and template_name in FIXED_TEMPLATES:
+        fixed_template = FixedTemplate(get_template(template_name),
+                                       FIXED_TEMPLATES[template_name])
+        _fixed_templates[template_name] = fixed_template
+    return fixed_template
+
+
+def render_template(template_name, context):
+    """Render a template into the XML payload"""
+    xml = None
+    if _fast_templates:
+        fixed_template = get_fixed_template(template_name)
+        if fixed_template is not None:
+            xml = fixed_template.render(context)
+
+    if xml is None:
+        xml = get_template(template_name).render(context)
+
+    # values with line breaks are the only source of them left
+    if '\n' in xml:
+        xml = spaceless(xml)
+    return xml
+
+
+def compile_templates(target):
+    """Compile the package templates into python modules at ``target``"""
+    get_environment().compile_templates(target, zip=None)
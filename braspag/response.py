@@ -8,7 +8,142 @@ from utils import to_bool
 from utils import to_int
 from utils import to_date
 from utils import to_unicode
-import xmltodict
+from utils import extract_dict
+from utils import extract_fields
+
+
+def _same(value):
+    return value
+
+
+# (field, tag, convert) of the transactions in dict responses
+TRANSACTION_FIELDS = (
+    ('braspag_transaction_id', 'BraspagTransactionId', _same),
+    ('acquirer_transaction_id', 'AcquirerTransactionId', _same),
+    ('authorization_code', 'AuthorizationCode', _same),
+    ('amount', 'Amount', to_int),
+    ('status', 'Status', to_int),
+    ('proof_of_sale', 'ProofOfSale', _same),
+)
+
+# fields only set when their tag is in the response
+OPTIONAL_TRANSACTION_FIELDS = (
+    ('masked_credit_card_number', 'MaskedCreditCardNumber', _same),
+    ('return_code', 'ReturnCode', _same),
+    ('return_message', 'ReturnMessage', _same),
+    ('error_code', 'ErrorCode', _same),
+    ('error_message', 'ErrorMessage', _same),
+    ('payment_method', 'PaymentMethod', to_int),
+    ('card_token', 'CreditCardToken', _same),
+    ('payment_method_name', 'PaymentMethodName', _same),
+    ('transaction_type', 'TransactionType', to_int),
+    ('received_date', 'ReceivedDate', to_date),
+    ('captured_date', 'CapturedDate', to_date),
+    ('voided_date', 'VoidedDate', to_date),
+    ('order_id', 'OrderId', _same),
+    ('currency', 'Currency', _same),
+    ('country', 'Country', _same),
+    ('number_of_payments', 'NumberOfPayments', to_int),
+)
+
+
+class TransactionRecord(object):
+    """Transaction of a dict response, stored in slots, when the response
+    is created with ``compact=True``.
+
+    It can be read as the dict returned by default, with the optional
+    fields missing from the response absent from its keys::
+
+        transaction['amount']
+        transaction.get('card_token')
+        transaction.to_dict()
+    """
+
+    __slots__ = tuple(
+        [field for field, tag, convert in TRANSACTION_FIELDS] +
+        ['status_message'] +
+        [field for field, tag, convert in OPTIONAL_TRANSACTION_FIELDS]
+    )
+
+    __hash__ = None
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def keys(self):
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def has_key(self, key):
+        return key in self
+
+    def __contains__(self, key):
+        return key in self.__slots__ and hasattr(self, key)
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, TransactionRecord):
+            other = other.to_dict()
+        elif not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def __repr__(self):
+        return 'TransactionRecord({0!r})'.format(self.to_dict())
+
+
+# (slot setter, tag, convert) used to fill the records without building a
+# dict first
+_RECORD_FIELDS = tuple((getattr(TransactionRecord, field).__set__, tag, convert)
+                       for field, tag, convert in TRANSACTION_FIELDS)
+_OPTIONAL_RECORD_FIELDS = tuple((getattr(TransactionRecord, field).__set__, tag, convert)
+                                for field, tag, convert in OPTIONAL_TRANSACTION_FIELDS)
 
 
 class PagadorResponse(object):
@@ -24,7 +159,26 @@ class PagadorResponse(object):
 
         self.parse_xml(xml)
 
+    def _get_field_index(self):
+        """Return the fields indexed by the local name of their tag, as
+        {tag: [(field, convert), ...]}. It is built once per class.
+        """
+        cls = type(self)
+        index = cls.__dict__.get('_field_index')
+        if index is None:
+            index = {}
+            for field, tag_info in self._fields.items():
+                if isinstance(tag_info, (list, tuple)):
+                    tag, convert = tag_info
+                else:
+                    tag = tag_info
+                    convert = to_unicode
+                index.setdefault(tag, []).append((field, convert))
+            cls._field_index = index
+        return index
+
     def parse_xml(self, xml):
+        index = self._get_field_index()
 
         # Set None as defaults
         for field in self._fields:
@@ -32,23 +186,20 @@ class PagadorResponse(object):
 
         xml = ET.fromstring(xml)
         for elem in xml.iter():
-            # if elem.text:
-                for field, tag_info in self._fields.items():
-                    if isinstance(tag_info, (list, tuple)):
-                        tag, convert = tag_info
-                    else:
-                        tag = tag_info
-                        convert = to_unicode
-
-                    if elem.tag.endswith('}' + tag):
-                        value = convert(unicode(elem.text).strip())
-                        setattr(self, field, value)
-                    elif elem.tag.endswith('}ErrorReportDataResponse'):
-                        error = self._get_error(elem)
-                        self.errors = self._put_error(error, self.errors)
-                    elif elem.tag == 'faultstring':
-                        error = [0, elem.text]
-                        self.errors = self._put_error(error, self.errors)
+            namespace, closing_brace, tag = elem.tag.rpartition('}')
+
+            if closing_brace:
+                fields = index.get(tag)
+                if fields is not None:
+                    value = unicode(elem.text).strip()
+                    for field, convert in fields:
+                        setattr(self, field, convert(value))
+                elif tag == 'ErrorReportDataResponse':
+                    error = self._get_error(elem)
+                    self.errors = self._put_error(error, self.errors)
+            elif tag == 'faultstring':
+                error = [0, elem.text]
+                self.errors = self._put_error(error, self.errors)
 
     def _put_error(self, error, errors):
         if not error in errors:
@@ -65,15 +216,45 @@ class PagadorResponse(object):
 
 
 class PagadorDictResponse(object):
+    """Response built from the operation result element only, found at
+    RESULT_PATH below the SOAP body and extracted with utils.extract_dict.
+    Subclasses read it in load().
+
+    :arg lazy: Only read ``success`` and ``correlation_id`` up front and
+               keep the XML, extracting and loading the transactions and
+               errors on first access to any other attribute.
+    :arg compact: Store the transactions in TransactionRecord objects
+                  instead of dicts, using less memory.
+    """
+
+    RESULT_PATH = ()
+
+    def __init__(self, xml, lazy=False, compact=False):
+        self._compact = compact
+        if lazy:
+            self.get_body_data(extract_fields(xml, self.RESULT_PATH, ('CorrelationId', 'Success')))
+            self._lazy_xml = xml
+            return
+
+        body = extract_dict(xml, self.RESULT_PATH)
+        self.get_body_data(body)
+        self._load(body)
 
-    def __init__(self, xml):
-        dictxml = xmltodict.parse(xml)
-        self.body = dict
+    def __getattr__(self, name):
+        # only called for missing attributes, i.e. not loaded yet
+        if name.startswith('__') or '_lazy_xml' not in self.__dict__:
+            raise AttributeError(name)
+
+        self._load(extract_dict(self.__dict__.pop('_lazy_xml'), self.RESULT_PATH))
+        return getattr(self, name)
+
+    def _load(self, body):
         self.transactions = []
         self.errors = []
+        self.load(body)
 
-        if dictxml['soap:Envelope']['soap:Body']:
-            self.body = dictxml['soap:Envelope']['soap:Body']
+    def load(self, body):
+        pass
 
     def get_body_data(self, body):
         self.correlation_id = body.get('CorrelationId')
@@ -82,65 +263,26 @@ class PagadorDictResponse(object):
     def format_transactions(self, transaction_items):
         if isinstance(transaction_items, list):
             [self.format_transactions(t) for t in transaction_items]
-        else:
-            status = to_int(transaction_items.get('Status'))
-            data = {
-                'braspag_transaction_id': transaction_items.get('BraspagTransactionId'),
-                'acquirer_transaction_id': transaction_items.get('AcquirerTransactionId'),
-                'authorization_code': transaction_items.get('AuthorizationCode'),
-                'amount': to_int(transaction_items.get('Amount')),
-                'status': status,
-                'status_message': self.STATUS[status],
-                'proof_of_sale': transaction_items.get('ProofOfSale'),
-            }
-
-            if transaction_items.has_key('MaskedCreditCardNumber'):
-                data['masked_credit_card_number'] = transaction_items.get('MaskedCreditCardNumber')
-
-            if transaction_items.has_key('ReturnCode'):
-                data['return_code'] = transaction_items.get('ReturnCode')
-
-            if transaction_items.has_key('ReturnMessage'):
-                data['return_message'] = transaction_items.get('ReturnMessage')
-
-            if transaction_items.has_key('ErrorCode'):
-                data['error_code'] = transaction_items.get('ErrorCode')
-
-            if transaction_items.has_key('ErrorMessage'):
-                data['error_message'] = transaction_items.get('ErrorMessage')
+        elif self._compact:
+            record = TransactionRecord()
+            for set_field, tag, convert in _RECORD_FIELDS:
+                set_field(record, convert(transaction_items.get(tag)))
+            record.status_message = self.STATUS[record.status]
 
-            if transaction_items.has_key('PaymentMethod'):
-                data['payment_method'] = to_int(transaction_items.get('PaymentMethod'))
+            for set_field, tag, convert in _OPTIONAL_RECORD_FIELDS:
+                if tag in transaction_items:
+                    set_field(record, convert(transaction_items[tag]))
 
-            if transaction_items.has_key('CreditCardToken'):
-                data['card_token'] = transaction_items.get('CreditCardToken')
-
-            if transaction_items.has_key('PaymentMethodName'):
-                data['payment_method_name'] = transaction_items.get('PaymentMethodName')
-
-            if transaction_items.has_key('TransactionType'):
-                data['transaction_type'] = to_int(transaction_items.get('TransactionType'))
-
-            if transaction_items.has_key('ReceivedDate'):
-                data['received_date'] = to_date(transaction_items.get('ReceivedDate'))
-
-            if transaction_items.has_key('CapturedDate'):
-                data['captured_date'] = to_date(transaction_items.get('CapturedDate'))
-
-            if transaction_items.has_key('VoidedDate'):
-                data['voided_date'] = to_date(transaction_items.get('VoidedDate'))
-
-            if transaction_items.has_key('OrderId'):
-                data['order_id'] = transaction_items.get('OrderId')
-
-            if transaction_items.has_key('Currency'):
-                data['currency'] = transaction_items.get('Currency')
-
-            if transaction_items.has_key('Country'):
-                data['country'] = transaction_items.get('Country')
+            self.transactions.append(record)
+        else:
+            data = {}
+            for field, tag, convert in TRANSACTION_FIELDS:
+                data[field] = convert(transaction_items.get(tag))
+            data['status_message'] = self.STATUS[data['status']]
 
-            if transaction_items.has_key('NumberOfPayments'):
-                data['number_of_payments'] = to_int(transaction_items.get('NumberOfPayments'))
+            for field, tag, convert in OPTIONAL_TRANSACTION_FIELDS:
+                if tag in transaction_items:
+                    data[field] = convert(transaction_items[tag])
 
             self.transactions.append(data)
 
@@ -164,11 +306,9 @@ class CreditCardAuthorizationResponse(PagadorDictResponse):
         4: 'Waiting for Answer',
     }
 
-    def __init__(self, xml):
-        super(CreditCardAuthorizationResponse, self).__init__(xml)
-        body = self.body.get('AuthorizeTransactionResponse').get('AuthorizeTransactionResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('AuthorizeTransactionResponse', 'AuthorizeTransactionResult')
 
+    def load(self, body):
         if self.success:
             self.braspag_order_id = body.get('OrderData').get('BraspagOrderId')
             self.order_id = body.get('OrderData').get('OrderId')
@@ -190,11 +330,9 @@ class CreditCardCaptureResponse(PagadorDictResponse):
         4: 'Waiting for Answer',
     }
 
-    def __init__(self, xml):
-        super(CreditCardCaptureResponse, self).__init__(xml)
-        body = self.body.get('CaptureCreditCardTransactionResponse').get('CaptureCreditCardTransactionResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('CaptureCreditCardTransactionResponse', 'CaptureCreditCardTransactionResult')
 
+    def load(self, body):
         if self.success:
             transactions = body.get('TransactionDataCollection').get('TransactionDataResponse')
             self.format_transactions(transactions)
@@ -211,11 +349,9 @@ class CreditCardCancelResponse(PagadorDictResponse):
         2: 'Invalid Transaction',
     }
 
-    def __init__(self, xml):
-        super(CreditCardCancelResponse, self).__init__(xml)
-        body = self.body.get('VoidCreditCardTransactionResponse').get('VoidCreditCardTransactionResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('VoidCreditCardTransactionResponse', 'VoidCreditCardTransactionResult')
 
+    def load(self, body):
         if self.success:
             transactions = body.get('TransactionDataCollection').get('TransactionDataResponse')
             self.format_transactions(transactions)
@@ -233,10 +369,9 @@ class CreditCardRefundResponse(PagadorDictResponse):
         3: 'Refund Accepted'
     }
 
-    def __init__(self, xml):
-        super(CreditCardRefundResponse, self).__init__(xml)
-        body = self.body.get('RefundCreditCardTransactionResponse').get('RefundCreditCardTransactionResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('RefundCreditCardTransactionResponse', 'RefundCreditCardTransactionResult')
+
+    def load(self, body):
         if self.success:
             transactions = body.get('TransactionDataCollection').get('TransactionDataResponse')
             self.format_transactions(transactions)
@@ -258,10 +393,9 @@ class BraspagOrderDataResponse(PagadorDictResponse):
         7: 'Unqualified',
     }
 
-    def __init__(self, xml):
-        super(BraspagOrderDataResponse, self).__init__(xml)
-        body = self.body.get('GetOrderDataResponse').get('GetOrderDataResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('GetOrderDataResponse', 'GetOrderDataResult')
+
+    def load(self, body):
         if self.success:
             transactions = body.get('TransactionDataCollection').get('OrderTransactionDataResponse')
             self.format_transactions(transactions)
@@ -272,10 +406,9 @@ class BraspagOrderDataResponse(PagadorDictResponse):
 
 class BraspagOrderIdDataResponse(PagadorDictResponse):
 
-    def __init__(self, xml):
-        super(BraspagOrderIdDataResponse, self).__init__(xml)
-        body = self.body.get('GetOrderIdDataResponse').get('GetOrderIdDataResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('GetOrderIdDataResponse', 'GetOrderIdDataResult')
+
+    def load(self, body):
         self.orders = []
 
         if self.success:
@@ -336,10 +469,9 @@ class TransactionDataResponse(PagadorDictResponse):
         7: 'Unqualified',
     }
 
-    def __init__(self, xml):
-        super(TransactionDataResponse, self).__init__(xml)
-        body = self.body.get('GetTransactionDataResponse').get('GetTransactionDataResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('GetTransactionDataResponse', 'GetTransactionDataResult')
+
+    def load(self, body):
         if self.success:
             self.format_transactions(body)
             self.transaction = self.transactions[0]
@@ -350,13 +482,18 @@ class TransactionDataResponse(PagadorDictResponse):
 
 
 class ProtectedCardResponse(object):
+
+    RESULT_PATH = ()
+
     def __init__(self, xml):
-        dictxml = xmltodict.parse(xml)
-        self.body = dict
         self.errors = []
 
-        if dictxml['soap:Envelope']['soap:Body']:
-            self.body = dictxml['soap:Envelope']['soap:Body']
+        body = extract_dict(xml, self.RESULT_PATH)
+        self.get_body_data(body)
+        self.load(body)
+
+    def load(self, body):
+        pass
 
     def get_body_data(self, body):
         self.correlation_id = body.get('CorrelationId')
@@ -373,11 +510,9 @@ class ProtectedCardResponse(object):
 
 
 class AddCardResponse(ProtectedCardResponse):
-    def __init__(self, xml):
-        super(AddCardResponse, self).__init__(xml)
-        body = self.body.get('SaveCreditCardResponse').get('SaveCreditCardResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('SaveCreditCardResponse', 'SaveCreditCardResult')
 
+    def load(self, body):
         if self.success:
             self.just_click_key = body.get('JustClickKey')
         else:
@@ -386,22 +521,18 @@ class AddCardResponse(ProtectedCardResponse):
 
 
 class InvalidateCardResponse(ProtectedCardResponse):
-    def __init__(self, xml):
-        super(InvalidateCardResponse, self).__init__(xml)
-        body = self.body.get('InvalidateCreditCardResponse').get('InvalidateCreditCardResult')
-        self.get_body_data(body)
+    RESULT_PATH = ('InvalidateCreditCardResponse', 'InvalidateCreditCardResult')
 
+    def load(self, body):
         if not self.success:
             error_items = body.get('ErrorReportCollection').get('ErrorReport')
             self.format_errors(error_items)
 
 
 class GetCardResponse(ProtectedCardResponse):
-    def __init__(self, xml):
-        super(GetCardResponse, self).__init__(xml)
-        body = self.body.get('GetCreditCardResponse', {}).get('GetCreditCardResult', {})
-        self.get_body_data(body)
+    RESULT_PATH = ('GetCreditCardResponse', 'GetCreditCardResult')
 
+    def load(self, body):
         if self.success:
             self.card_holder = body.get('CardHolder')
             self.card_number = body.get('CardNumber')
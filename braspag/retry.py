@@ -0,0 +1,53 @@
+# -*- encoding: utf-8 -*-
+from __future__ import absolute_import
+
+import random
+
+from tornado.httpclient import HTTPError
+
+
+class RetryPolicy(object):
+    """Describe how a failed request should be retried.
+
+    :arg max_attempts: Maximum number of attempts, including the first one.
+    :arg backoff: Delay, in seconds, before the first retry. It doubles on
+                  each new attempt.
+    :arg max_backoff: Upper bound for the delay between attempts.
+    :arg jitter: Fraction of the delay that is randomized, from 0 (no
+                 jitter) to 1 (full jitter).
+    :arg deadline: Maximum time, in seconds, spent on all the attempts. No
+                   retry is made if it would start after the deadline.
+    :arg status_codes: HTTP status codes considered transient. 599 is used
+                       by Tornado for timeouts and connection errors.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.1, max_backoff=2.0, jitter=1.0,
+                 deadline=None, status_codes=(500, 502, 503, 504, 599)):
+        assert max_attempts >= 1, 'max_attempts must be at least 1'
+        assert 0 <= jitter <= 1, 'jitter must be between 0 and 1'
+
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.status_codes = frozenset(status_codes)
+
+    def get_delay(self, attempt):
+        """Return the delay before the attempt following ``attempt``"""
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        return delay - delay * self.jitter * random.random()
+
+    def should_retry(self, error, attempt):
+        """Whether a new attempt should be made after ``error``"""
+        if attempt >= self.max_attempts:
+            return False
+
+        if isinstance(error, HTTPError):
+            return error.code in self.status_codes
+
+        # connection errors (refused, reset, ...) raised by the HTTP client
+        return isinstance(error, IOError)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
@@ -0,0 +1,170 @@
+# -*- encoding: utf-8 -*-
+"""Blocking access to the request objects for threaded code (e.g. WSGI
+workers)::
+
+    from braspag import BraspagRequest
+    from braspag.sync import SyncClient
+
+    braspag = SyncClient(lambda: BraspagRequest(MERCHANT_ID), timeout=30)
+    response = braspag.get_transaction_data(transaction_id=transaction_id)
+
+Every client runs its calls on a single IOLoop thread per process, so the
+HTTP client and its connections are shared by all the threads. Clients
+created before a fork (e.g. ``gunicorn --preload``) start a new loop thread
+and request object in the child process on their first call.
+"""
+from __future__ import absolute_import
+
+import os
+import sys
+import threading
+
+from concurrent.futures import Future
+from tornado import gen
+from tornado.concurrent import is_future
+from tornado.ioloop import IOLoop
+
+
+_loop_thread = None
+_loop_thread_lock = threading.Lock()
+
+
+class IOLoopThread(object):
+    """IOLoop running on a daemon thread, accepting calls from any other
+    thread.
+    """
+
+    def __init__(self, name='braspag-ioloop'):
+        self.io_loop = None
+        self.pid = os.getpid()
+
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(started,), name=name)
+        self.thread.daemon = True
+        self.thread.start()
+        started.wait()
+
+    def _run(self, started):
+        self.io_loop = IOLoop()
+        self.io_loop.make_current()
+        started.set()
+        self.io_loop.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Call func on the loop thread. Returns a concurrent.futures.Future
+        of its result, which is awaited if it is a Tornado future.
+        """
+        future = Future()
+
+        @gen.coroutine
+        def call():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = func(*args, **kwargs)
+                if is_future(result):
+                    result = yield result
+            except Exception:
+                _set_exception(future, sys.exc_info())
+            else:
+                future.set_result(result)
+
+        self.io_loop.add_callback(call)
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Call func on the loop thread and wait for its result.
+
+        :arg timeout: Seconds to wait, as a keyword argument. The call goes
+                      on after a concurrent.futures.TimeoutError.
+        """
+        timeout = kwargs.pop('timeout', None)
+        return self.submit(func, *args, **kwargs).result(timeout)
+
+    def stop(self):
+        self.io_loop.add_callback(self.io_loop.stop)
+        self.thread.join()
+
+
+def get_loop_thread():
+    """Return the IOLoopThread of the process, starting it if needed"""
+    global _loop_thread
+    with _loop_thread_lock:
+        # threads do not survive a fork
+        if _loop_thread is None or _loop_thread.pid != os.getpid():
+            _loop_thread = IOLoopThread()
+        return _loop_thread
+
+
+class SyncClient(object):
+    """Call the operations of a request object from any thread, blocking
+    until they finish. The calls run on the loop thread of the process.
+
+    :arg factory: Callable returning the BraspagRequest or
+                  ProtectedCardRequest. It is called on the loop thread,
+                  so the HTTP client is created for its IOLoop, and again
+                  in each forked process.
+    :arg timeout: Default number of seconds to wait for each call.
+    """
+
+    def __init__(self, factory, timeout=None):
+        self.factory = factory
+        self.timeout = timeout
+        self._pid = None
+        self._loop_thread = None
+        self._request = None
+        self._lock = threading.Lock()
+        self._setup()
+
+    def _setup(self):
+        """Return the loop thread and the request object of the process,
+        creating the request object again after a fork.
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    loop_thread = get_loop_thread()
+                    self._request = loop_thread.run(self.factory)
+                    self._loop_thread = loop_thread
+                    self._pid = os.getpid()
+        return self._loop_thread, self._request
+
+    @property
+    def loop_thread(self):
+        return self._setup()[0]
+
+    @property
+    def request(self):
+        return self._setup()[1]
+
+    def submit(self, operation, **kwargs):
+        """Start an operation (e.g. ``'capture'``), returning a
+        concurrent.futures.Future of its response.
+        """
+        loop_thread, request = self._setup()
+        return loop_thread.submit(getattr(request, operation), **kwargs)
+
+    def call(self, operation, **kwargs):
+        """Run an operation and return its response.
+
+        :arg timeout: Seconds to wait, overriding the client timeout.
+        """
+        timeout = kwargs.pop('timeout', self.timeout)
+        return self.submit(operation, **kwargs).result(timeout)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(self.request, name, None)):
+            raise AttributeError(name)
+
+        def operation(**kwargs):
+            return self.call(name, **kwargs)
+        operation.__name__ = name
+        return operation
+
+
+def _set_exception(future, exc_info):
+    # keep the traceback when the futures backport supports it
+    if hasattr(future, 'set_exception_info'):
+        future.set_exception_info(exc_info[1], exc_info[2])
+    else:
+        future.set_exception(exc_info[1])
@@ -0,0 +1,80 @@
+# -*- encoding: utf-8 -*-
+from __future__ import absolute_import
+
+import time
+
+
+# time.monotonic is not available on Python 2
+clock = getattr(time, 'monotonic', time.time)
+
+# stages of a call, in the order they happen. The stages from 'log' to
+# 'transfer' break down the 'fetch' stage, and are only present when the
+# HTTP client reports them: the curl client reports the DNS, connect, TLS
+# and server times while the simple client only reports the request time.
+STAGES = (
+    'render',
+    'fetch',
+    'log',
+    'queue',
+    'dns',
+    'connect',
+    'tls',
+    'server',
+    'transfer',
+    'request',
+    'parse',
+    'total',
+)
+
+# stage -> (time_info key where it ends, time_info key where it starts)
+CURL_STAGES = (
+    ('dns', 'namelookup', None),
+    ('connect', 'connect', 'namelookup'),
+    ('tls', 'appconnect', 'connect'),
+    ('server', 'starttransfer', 'pretransfer'),
+    ('transfer', 'total', 'starttransfer'),
+)
+
+
+class Timings(dict):
+    """Seconds spent on each stage of a call, by stage name (see
+    ``STAGES``). The time of retried requests is added up.
+    """
+
+    def __init__(self):
+        super(Timings, self).__init__()
+        self.start_time = self.last_time = clock()
+
+    def add(self, stage, seconds):
+        self[stage] = self.get(stage, 0) + seconds
+
+    def mark(self, stage):
+        """Add the time elapsed since the last mark to ``stage``"""
+        now = clock()
+        self.add(stage, now - self.last_time)
+        self.last_time = now
+
+    def add_response(self, response, elapsed):
+        """Add the stages reported by a Tornado HTTPResponse.
+
+        :arg elapsed: Seconds since the request was given to the client.
+        """
+        time_info = response.time_info
+        if not time_info:
+            # the simple client measures the request since it left its queue
+            if response.request_time is not None:
+                self.add('queue', max(0, elapsed - response.request_time))
+                self.add('request', response.request_time)
+            return
+
+        self.add('queue', time_info.get('queue', 0))
+        for stage, end, start in CURL_STAGES:
+            if time_info.get(end):
+                self.add(stage, max(0, time_info[end] - time_info.get(start, 0)))
+
+    def finish(self):
+        self['total'] = clock() - self.start_time
+
+    def format(self):
+        return u' '.join(u'{0}={1:.3f}s'.format(stage, self[stage])
+                         for stage in STAGES if stage in self)
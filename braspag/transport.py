@@ -0,0 +1,122 @@
+# -*- encoding: utf-8 -*-
+from __future__ import absolute_import
+
+from tornado import httpclient
+from tornado.ioloop import IOLoop
+
+
+class Transport(object):
+    """HTTP transport settings shared by the request objects.
+
+    By default the process-wide ``AsyncHTTPClient`` singleton is used, which
+    is Tornado's ``SimpleAsyncHTTPClient`` limited to 10 concurrent requests.
+    Any extra request is kept in the client queue until a slot is released.
+
+    :arg backend: ``'simple'`` or ``'curl'`` (requires pycurl).
+    :arg max_clients: Maximum number of concurrent requests.
+    :arg keep_alive: Reuse connections between requests. Only the curl
+                     backend is able to keep connections alive.
+    :arg connect_timeout: Timeout, in seconds, for the initial connection.
+
+    A single transport may be shared by several requests objects, in which
+    case all of them use the same connection pool.
+    """
+
+    BACKENDS = ('simple', 'curl')
+
+    def __init__(self, backend='simple', max_clients=None, keep_alive=True,
+                 connect_timeout=None):
+        assert backend in self.BACKENDS, 'backend must be one of {0}'.format(self.BACKENDS)
+
+        self.backend = backend
+        self.max_clients = max_clients
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        # clients by id of their IOLoop, which they keep alive: the entries
+        # of closed loops are removed when a new client is created
+        self._clients = {}
+
+    @property
+    def is_default(self):
+        """Whether the shared ``AsyncHTTPClient`` singleton should be used"""
+        return (self.backend == 'simple' and self.max_clients is None and
+                self.connect_timeout is None)
+
+    def _get_client_class(self):
+        if self.backend == 'curl':
+            from tornado.curl_httpclient import CurlAsyncHTTPClient
+            return CurlAsyncHTTPClient
+
+        from tornado.simple_httpclient import SimpleAsyncHTTPClient
+        return SimpleAsyncHTTPClient
+
+    def _get_defaults(self):
+        defaults = {}
+
+        if self.connect_timeout is not None:
+            defaults['connect_timeout'] = self.connect_timeout
+
+        if self.backend == 'curl' and not self.keep_alive:
+            defaults['prepare_curl_callback'] = _forbid_reuse
+
+        return defaults
+
+    def create_client(self):
+        """Return the HTTP client for the current IOLoop, creating it on
+        first use.
+        """
+        if self.is_default:
+            return httpclient.AsyncHTTPClient()
+
+        io_loop = IOLoop.current()
+        client = self._clients.get(id(io_loop))
+        if client is None:
+            self._forget_closed_loops()
+
+            kwargs = {'defaults': self._get_defaults()}
+            if self.max_clients is not None:
+                kwargs['max_clients'] = self.max_clients
+
+            client = self._get_client_class()(force_instance=True, **kwargs)
+            self._clients[id(io_loop)] = client
+        return client
+
+    def _forget_closed_loops(self):
+        for key, client in list(self._clients.items()):
+            if _is_closed(client.io_loop):
+                del self._clients[key]
+
+    def stats(self, client=None):
+        """Return a dict with the pool size, the number of requests being
+        processed and the number of requests waiting for a free slot.
+        """
+        client = client or self.create_client()
+        max_clients = getattr(client, 'max_clients', None)
+
+        if hasattr(client, '_free_list'):
+            max_clients = len(client._curls)
+            active = max_clients - len(client._free_list)
+            queued = len(client._requests)
+        else:
+            active = len(getattr(client, 'active', ()))
+            queued = len(getattr(client, 'queue', ()))
+
+        return {
+            'backend': self.backend,
+            'max_clients': max_clients,
+            'active': active,
+            'queued': queued,
+        }
+
+
+def _is_closed(io_loop):
+    # IOLoop has no public way to tell whether it was closed
+    asyncio_loop = getattr(io_loop, 'asyncio_loop', None)
+    if asyncio_loop is not None:
+        return asyncio_loop.is_closed()
+    return getattr(io_loop, '_closing', False)
+
+
+def _forbid_reuse(curl):
+    import pycurl
+    curl.setopt(pycurl.FORBID_REUSE, 1)
@@ -6,6 +6,26 @@ import functools
 import warnings
 import xml.parsers.expat
 from datetime import datetime
+from io import BytesIO
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:  # pragma: no cover
+    import xml.etree.ElementTree as ElementTree
+
+SOAP_BODY_PATH = ('Envelope', 'Body')
+
+_UNESCAPE_CHARS_RE = re.compile(u'[&<>\r]')
+
+SENSITIVE_TAGS = ('CardNumber', 'CardSecurityCode', 'CardHolder', 'JustClickKey', 'CreditCardToken')
+
+_SENSITIVE_TAGS_RE = re.compile(r'<({0})>([^<]*)</\1>'.format('|'.join(SENSITIVE_TAGS)))
+
+DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+DATES_CACHE_SIZE = 1024
+
+_DATE_RE = re.compile(r'(\d\d?)/(\d\d?)/(\d{4}) (\d\d?):(\d\d?):(\d\d?) ([AaPp][Mm])\Z')
+_dates = {}
 
 def unescape(s):
     """Copied from http://wiki.python.org/moin/EscapingXml"""
@@ -36,6 +56,103 @@ def unescape(s):
         es = u""
     return es.join(list)
 
+def extract_dict(xml_str, path):
+    """Return the element at ``path`` below the SOAP body as a dict, or an
+    empty dict if the response does not have it.
+
+    The XML is parsed incrementally and every element outside of the path
+    is freed as soon as it ends, so only the requested subtree is kept.
+    Tags are matched by local name and become the keys of the dict; leaf
+    values are the stripped text (None if empty) and repeated tags become
+    lists. Attributes are ignored.
+
+    :arg path: Local names of the elements from the SOAP body down.
+    """
+    if isinstance(xml_str, unicode):
+        xml_str = xml_str.encode('utf-8')
+
+    target = SOAP_BODY_PATH + tuple(path)
+    level = 0    # depth of the current element
+    matched = 0  # number of open elements matching the target path
+
+    for event, elem in ElementTree.iterparse(BytesIO(xml_str), events=('start', 'end')):
+        if event == 'start':
+            if matched == level and matched < len(target):
+                if elem.tag.rpartition('}')[2] == target[matched]:
+                    matched += 1
+            level += 1
+            continue
+
+        if matched == level == len(target):
+            return _element_to_dict(elem)
+
+        if matched == level:
+            matched -= 1
+        level -= 1
+
+        if matched < len(target):
+            elem.clear()
+
+    return {}
+
+def extract_fields(xml_str, path, tags):
+    """Return the children of the element at ``path`` below the SOAP body
+    whose local name is in ``tags``, as a dict of their stripped text (None
+    if empty). Missing tags are absent from the dict.
+
+    Parsing stops as soon as every tag is found, so the fields written
+    first (e.g. CorrelationId and Success) are read without parsing the
+    rest of the response.
+    """
+    if isinstance(xml_str, unicode):
+        xml_str = xml_str.encode('utf-8')
+
+    target = SOAP_BODY_PATH + tuple(path)
+    level = 0
+    matched = 0
+    fields = {}
+
+    for event, elem in ElementTree.iterparse(BytesIO(xml_str), events=('start', 'end')):
+        if event == 'start':
+            if matched == level and matched < len(target):
+                if elem.tag.rpartition('}')[2] == target[matched]:
+                    matched += 1
+            level += 1
+            continue
+
+        if matched == len(target) and level == matched + 1:
+            tag = elem.tag.rpartition('}')[2]
+            if tag in tags and tag not in fields:
+                fields[tag] = _element_to_dict(elem)
+                if len(fields) == len(tags):
+                    return fields
+        elif matched == level == len(target):
+            return fields
+
+        if matched == level:
+            matched -= 1
+        level -= 1
+        elem.clear()
+
+    return fields
+
+def _element_to_dict(elem):
+    if not len(elem):
+        text = elem.text and elem.text.strip()
+        return unicode(text) if text else None
+
+    data = {}
+    for child in elem:
+        key = child.tag.rpartition('}')[2]
+        value = _element_to_dict(child)
+        if key not in data:
+            data[key] = value
+        elif isinstance(data[key], list):
+            data[key].append(value)
+        else:
+            data[key] = [data[key], value]
+    return data
+
 def to_bool(value):
     value = value.lower()
     if value == 'true':
@@ -50,10 +167,39 @@ def to_unicode(value):
     if isinstance(value, str):
         value = value.decode('utf-8')
 
+    # only these change when parsed again by unescape
+    if _UNESCAPE_CHARS_RE.search(value) is None:
+        return value
     return unescape(value)
 
 def to_date(value):
-    return datetime.strptime(value, '%m/%d/%Y %I:%M:%S %p')
+    """Parse the dates of Braspag, e.g. 11/15/2015 12:19:44 AM.
+    Transactions often share timestamps, so recent dates are cached.
+    """
+    date = _dates.get(value)
+    if date is None:
+        date = _parse_date(value)
+        if len(_dates) >= DATES_CACHE_SIZE:
+            _dates.clear()
+        _dates[value] = date
+    return date
+
+def _parse_date(value):
+    match = _DATE_RE.match(value)
+    if match is not None:
+        month, day, year, hour, minute, second, period = match.groups()
+        hour = int(hour)
+        minute = int(minute)
+        second = int(second)
+
+        if 1 <= hour <= 12 and minute < 60 and second < 60:
+            hour %= 12
+            if period in ('PM', 'pm', 'Pm', 'pM'):
+                hour += 12
+            return datetime(int(year), int(month), int(day), hour, minute, second)
+
+    # anything else is left to strptime, with its errors
+    return datetime.strptime(value, DATE_FORMAT)
 
 def to_int(value):
     if value.isdigit():
@@ -99,25 +245,16 @@ def method_must_be_redesigned(func):
 
 def mask_card_data_from_xml(xml):
     '''
-    It receives a xml and return it all credit cards tags masked.
+    It receives a xml and return it with the card data and tokens masked,
+    in a single pass over the xml.
     '''
-    def mask_card_number(match_obj):
-        card_number = match_obj.group(1)
-        asterisks = u'*' * 6
-        first_digits = card_number[:6]
-        last_digits = card_number[-4:]
-        masked = u'<CardNumber>{0}{1}{2}</CardNumber>'.format(first_digits,
-                                                              asterisks,
-                                                              last_digits)
-        return masked
-
-    def mask_card_security_code(match_obj):
-        card_security_code = match_obj.group(1)
-        asterisks = u'*' * len(card_security_code)
-        masked = u'<CardSecurityCode>{0}</CardSecurityCode>'.format(asterisks)
-        return masked
-
-    xml = re.sub(r'<CardNumber>(\d*)</CardNumber>', mask_card_number, xml)
-    xml = re.sub(r'<CardSecurityCode>(\d*)</CardSecurityCode>', mask_card_security_code, xml)
-    return xml
+    return _SENSITIVE_TAGS_RE.sub(_mask_tag, xml)
 
+def _mask_tag(match_obj):
+    tag, value = match_obj.groups()
+    if tag == 'CardNumber':
+        # first 6 and last 4 digits are kept
+        masked = u'{0}{1}{2}'.format(value[:6], u'*' * 6, value[-4:])
+    else:
+        masked = u'*' * len(value)
+    return u'<{0}>{1}</{0}>'.format(tag, masked)
@@ -22,12 +22,18 @@ setup(
     author='Sergio Oliveira',
     author_email='sergio@tracy.com.br',
     url='https://github.com/luizalabs/braspag',
-    packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
+    packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests", "benchmarks", "benchmarks.*"]),
     package_data={
         'braspag': ['templates/*.xml'],
     },
+    entry_points={
+        'console_scripts': ['braspag-export = braspag.export:main'],
+    },
     test_suite='tests.suite',
     install_requires=requirements,
+    extras_require={
+        'newrelic': ['newrelic>=4.4.1.104,<5'],
+    },
     tests_require=requirements_test,
     zip_safe=False,
 )
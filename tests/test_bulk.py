@@ -0,0 +1,94 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from tornado import gen
+from tornado.testing import gen_test
+
+from braspag.exceptions import HTTPTimeoutError
+
+from .base import BraspagTestCase
+from .vcrutils import failed_response
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'53a90294-e8b4-4e63-9f83-1e69ac387034'
+
+
+class BulkExecutorTest(BraspagTestCase):
+
+    @gen_test
+    def test_bounded_concurrency(self):
+        state = {'running': 0, 'max_running': 0}
+
+        @gen.coroutine
+        def operation(number):
+            state['running'] += 1
+            state['max_running'] = max(state['max_running'], state['running'])
+            yield gen.moment
+            state['running'] -= 1
+            raise gen.Return(number * 2)
+
+        with mock.patch.object(self.braspag, 'capture', operation, create=True):
+            bulk = self.braspag.bulk('capture', ({'number': n} for n in range(20)), concurrency=3)
+            results = []
+            while (yield bulk.fetch_next()):
+                results.append(bulk.next_result())
+
+        assert state['max_running'] == 3
+        assert sorted((item['number'], result) for item, result in results) == [
+            (n, n * 2) for n in range(20)
+        ]
+        assert not (yield bulk.fetch_next())
+
+    @gen_test
+    def test_errors_are_returned_as_results(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = [
+                recorded_response('test_authorize_capture_refund', 1),
+                failed_response(HTTPTimeoutError(599)),
+            ]
+            items = [
+                {'transaction_id': TRANSACTION_ID, 'amount': 100000},
+                {'transaction_id': TRANSACTION_ID, 'amount': 100000},
+                {'transaction_id': u'invalid', 'amount': 100000},
+            ]
+            bulk = self.braspag.bulk('capture', items, concurrency=1)
+            results = []
+            while (yield bulk.fetch_next()):
+                results.append(bulk.next_result()[1])
+
+        assert results[0].success == True
+        assert isinstance(results[1], HTTPTimeoutError)
+        assert isinstance(results[2], AssertionError)
+
+    @gen_test
+    def test_rate_limit(self):
+        @gen.coroutine
+        def operation():
+            raise gen.Return(self.io_loop.time())
+
+        with mock.patch.object(self.braspag, 'capture', operation, create=True):
+            bulk = self.braspag.bulk('capture', [{}] * 4, concurrency=4, rate_limit=20)
+            started = []
+            while (yield bulk.fetch_next()):
+                started.append(bulk.next_result()[1])
+
+        started.sort()
+        assert started[-1] - started[0] >= 0.14
+
+    @gen_test
+    def test_failing_iterable(self):
+        def items():
+            yield {}
+            raise ValueError()
+
+        @gen.coroutine
+        def operation():
+            raise gen.Return(None)
+
+        with mock.patch.object(self.braspag, 'capture', operation, create=True):
+            bulk = self.braspag.bulk('capture', items(), concurrency=2)
+            with self.assertRaises(ValueError):
+                while (yield bulk.fetch_next()):
+                    pass
@@ -0,0 +1,155 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.cache import ResponseCache
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class ResponseCacheTest(BraspagTestCase):
+
+    def setUp(self):
+        super(ResponseCacheTest, self).setUp()
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_size=2, ttl=10, ttls={'get_order_data': 0},
+                                   clock=self.clock)
+
+    def test_hit_and_miss(self):
+        assert self.cache.get('get_transaction_data', 'A') is None
+        self.cache.set('get_transaction_data', 'A', 'response')
+
+        assert self.cache.get('get_transaction_data', 'a') == 'response'
+        assert self.cache.stats()['hits'] == 1
+        assert self.cache.stats()['misses'] == 1
+
+    def test_expiration(self):
+        self.cache.set('get_transaction_data', 'a', 'response')
+        self.clock.now = 10
+
+        assert self.cache.get('get_transaction_data', 'a') is None
+        assert len(self.cache) == 0
+
+    def test_operation_without_ttl_is_not_cached(self):
+        self.cache.set('get_order_data', 'a', 'response')
+
+        assert len(self.cache) == 0
+
+    def test_lru_eviction(self):
+        self.cache.set('get_transaction_data', 'a', 'a')
+        self.cache.set('get_transaction_data', 'b', 'b')
+        self.cache.get('get_transaction_data', 'a')
+        self.cache.set('get_transaction_data', 'c', 'c')
+
+        assert self.cache.get('get_transaction_data', 'b') is None
+        assert self.cache.get('get_transaction_data', 'a') == 'a'
+        assert self.cache.stats()['evictions'] == 1
+
+    def test_invalidate_transaction(self):
+        self.cache.set('get_transaction_data', 'a', 'a', transaction_ids=['T1'])
+        self.cache.set('get_customer_data', 'b', 'b', transaction_ids=['T2'])
+        self.cache.invalidate_transaction('t1')
+
+        assert self.cache.get('get_transaction_data', 'a') is None
+        assert self.cache.get('get_customer_data', 'b') == 'b'
+        assert self.cache.stats()['invalidations'] == 1
+
+    def test_order_ids_are_case_sensitive(self):
+        self.cache.set('get_braspag_order_id_by_order', 'Ab1', 'Ab1')
+
+        assert self.cache.get('get_braspag_order_id_by_order', 'aB1') is None
+        assert self.cache.get('get_braspag_order_id_by_order', 'Ab1') == 'Ab1'
+
+    def test_non_ascii_order_id(self):
+        self.cache.set('get_braspag_order_id_by_order', 'pedido-\xc3\xa7', 'response')
+
+        assert self.cache.get('get_braspag_order_id_by_order', 'pedido-\xc3\xa7') == 'response'
+
+    def test_query_started_before_invalidation_is_not_cached(self):
+        generation = self.cache.generation()
+        self.cache.invalidate_transaction('t1')
+        self.cache.set('get_transaction_data', 'a', 'a', transaction_ids=['T1'], generation=generation)
+        self.cache.set('get_transaction_data', 'b', 'b', transaction_ids=['T2'], generation=generation)
+
+        assert self.cache.get('get_transaction_data', 'a') is None
+        assert self.cache.get('get_transaction_data', 'b') == 'b'
+
+        self.cache.set('get_transaction_data', 'a', 'a', transaction_ids=['T1'],
+                       generation=self.cache.generation())
+        assert self.cache.get('get_transaction_data', 'a') == 'a'
+
+    def test_forgotten_invalidations(self):
+        generation = self.cache.generation()
+        for transaction_id in ('T1', 'T2', 'T3'):
+            self.cache.invalidate_transaction(transaction_id)
+
+        # T1 is no longer tracked with max_size=2, older queries are not cached
+        self.cache.set('get_transaction_data', 'a', 'a', transaction_ids=['T4'], generation=generation)
+        assert self.cache.get('get_transaction_data', 'a') is None
+
+
+class RequestCacheTest(BraspagTestCase):
+
+    def setUp(self):
+        super(RequestCacheTest, self).setUp()
+        self.braspag = BraspagRequest(MERCHANT_ID, homologation=True, cache=ResponseCache())
+
+    @gen_test
+    def test_query_is_cached_until_capture(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = [
+                recorded_response('test_get_transaction_data', 1),
+                recorded_response('test_authorize_capture_refund', 1),
+                recorded_response('test_get_transaction_data', 1),
+            ]
+            first = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+            second = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID.upper())
+
+            assert fetch.call_count == 1
+            assert first is second
+
+            yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+            third = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert fetch.call_count == 3
+        assert third is not first
+        assert third.transaction['status'] == 2
+
+    @gen_test
+    def test_query_in_flight_during_capture_is_not_cached(self):
+        pending = Future()
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = [
+                pending,
+                recorded_response('test_authorize_capture_refund', 1),
+                recorded_response('test_get_transaction_data', 1),
+            ]
+            query = self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+            yield gen.moment
+            yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+            pending.set_result(recorded_response('test_get_transaction_data', 1).result())
+            stale = yield query
+            fresh = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert fetch.call_count == 3
+        assert fresh is not stale
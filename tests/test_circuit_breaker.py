@@ -0,0 +1,167 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.circuitbreaker import CircuitBreaker
+from braspag.exceptions import CircuitOpenError
+from braspag.exceptions import HTTPTimeoutError
+from braspag.retry import RetryPolicy
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import failed_response
+from .vcrutils import recorded_response
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(BraspagTestCase):
+
+    def setUp(self):
+        super(CircuitBreakerTest, self).setUp()
+        self.clock = FakeClock()
+        self.changes = []
+        self.breaker = CircuitBreaker(
+            'url', error_threshold=0.5, window=4, min_calls=4, reset_timeout=10,
+            on_state_change=lambda breaker, old, new: self.changes.append((old, new)),
+            clock=self.clock
+        )
+
+    def test_opens_on_error_rate(self):
+        for failed in (False, True, False):
+            self.breaker.before_call()
+            self.breaker.record(failed)
+        assert self.breaker.state == CircuitBreaker.CLOSED
+
+        self.breaker.before_call()
+        self.breaker.record(True)
+        assert self.breaker.state == CircuitBreaker.OPEN
+        assert self.changes == [('closed', 'open')]
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_slow_calls_are_failures(self):
+        self.breaker.latency_threshold = 1
+        for _ in range(4):
+            self.breaker.before_call()
+            self.breaker.record(False, latency=2)
+        assert self.breaker.state == CircuitBreaker.OPEN
+
+    def test_half_open(self):
+        for _ in range(4):
+            self.breaker.record(True)
+
+        self.clock.now = 10
+        trial = self.breaker.before_call()
+        assert self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        # only one trial call at a time
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record(True, trial=trial)
+        assert self.breaker.state == CircuitBreaker.OPEN
+
+        self.clock.now = 20
+        trial = self.breaker.before_call()
+        self.breaker.record(False, trial=trial)
+        assert self.breaker.state == CircuitBreaker.CLOSED
+        assert self.changes == [
+            ('closed', 'open'), ('open', 'half_open'), ('half_open', 'open'),
+            ('open', 'half_open'), ('half_open', 'closed'),
+        ]
+
+    def test_only_the_trial_call_ends_half_open(self):
+        # calls started while the circuit was closed
+        calls = [self.breaker.before_call() for _ in range(6)]
+        assert calls == [None] * 6
+        for _ in range(4):
+            self.breaker.record(True)
+        assert self.breaker.state == CircuitBreaker.OPEN
+
+        self.clock.now = 10
+        trial = self.breaker.before_call()
+        assert trial is not None
+
+        self.breaker.record(False)
+        self.breaker.record(True)
+        assert self.breaker.state == CircuitBreaker.HALF_OPEN
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record(False, trial=trial)
+        assert self.breaker.state == CircuitBreaker.CLOSED
+
+
+class RequestCircuitBreakerTest(BraspagTestCase):
+
+    def setUp(self):
+        super(RequestCircuitBreakerTest, self).setUp()
+        self.braspag = BraspagRequest(
+            MERCHANT_ID,
+            homologation=True,
+            retry_policies={'get_transaction_data': RetryPolicy(max_attempts=1)},
+            circuit_breaker={'window': 2, 'min_calls': 2},
+        )
+
+    @gen_test
+    def test_fail_fast_when_open(self):
+        transaction_id = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.side_effect = lambda request: failed_response(HTTPTimeoutError(599))
+            for _ in range(2):
+                with self.assertRaises(HTTPTimeoutError):
+                    yield self.braspag.get_transaction_data(transaction_id=transaction_id)
+
+            with self.assertRaises(CircuitOpenError):
+                yield self.braspag.get_transaction_data(transaction_id=transaction_id)
+
+        assert http_client.fetch.call_count == 2
+
+        # the transaction service has its own circuit
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.return_value = recorded_response('test_authorize_capture_refund', 1)
+            response = yield self.braspag.capture(transaction_id=transaction_id, amount=100000)
+
+        assert response.success == True
+
+    @gen_test
+    def test_unexpected_error_ends_the_trial_call(self):
+        braspag = BraspagRequest(
+            MERCHANT_ID,
+            homologation=True,
+            retry_policies={'get_transaction_data': RetryPolicy(max_attempts=1)},
+            circuit_breaker={'window': 2, 'min_calls': 2, 'reset_timeout': 0},
+        )
+        transaction_id = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+        with mock.patch.object(braspag, 'http_client') as http_client:
+            http_client.fetch.side_effect = lambda request: failed_response(HTTPTimeoutError(599))
+            for _ in range(2):
+                with self.assertRaises(HTTPTimeoutError):
+                    yield braspag.get_transaction_data(transaction_id=transaction_id)
+
+            # the trial call fails with an error the client does not expect
+            http_client.fetch.side_effect = ValueError('unexpected')
+            with self.assertRaises(ValueError):
+                yield braspag.get_transaction_data(transaction_id=transaction_id)
+
+            http_client.fetch.side_effect = None
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            response = yield braspag.get_transaction_data(transaction_id=transaction_id)
+
+        assert response.success == True
+        breaker, = braspag.circuit_breakers.values()
+        assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,110 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from tornado.concurrent import Future
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.exceptions import HTTPTimeoutError
+from braspag.retry import RetryPolicy
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+class CoalesceQueriesTest(BraspagTestCase):
+
+    def setUp(self):
+        super(CoalesceQueriesTest, self).setUp()
+        self.braspag = BraspagRequest(
+            MERCHANT_ID,
+            homologation=True,
+            coalesce_queries=True,
+            retry_policies={'get_transaction_data': RetryPolicy(max_attempts=1)},
+        )
+
+    @gen_test
+    def test_concurrent_queries_share_response(self):
+        pending = Future()
+        with mock.patch.object(self.braspag, 'fetch', return_value=pending) as fetch:
+            futures = [
+                self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+                for _ in range(5)
+            ]
+            futures.append(self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID.upper()))
+
+            recorded = yield recorded_response('test_get_transaction_data', 1)
+            pending.set_result(recorded)
+            responses = yield futures
+
+        assert fetch.call_count == 1
+        assert all(response is responses[0] for response in responses)
+        assert self.braspag._inflight_queries == {}
+
+    @gen_test
+    def test_order_ids_are_case_sensitive(self):
+        pending = Future()
+        with mock.patch.object(self.braspag, 'fetch', return_value=pending) as fetch:
+            futures = [
+                self.braspag.get_braspag_order_id_by_order(order_id='Ab1'),
+                self.braspag.get_braspag_order_id_by_order(order_id='aB1'),
+                self.braspag.get_braspag_order_id_by_order(order_id='Ab1'),
+            ]
+            pending.set_result(recorded_response('test_get_braspag_order_id_by_order', 1).result())
+            responses = yield futures
+
+        assert fetch.call_count == 2
+        assert responses[0] is not responses[1]
+        assert responses[0] is responses[2]
+
+    @gen_test
+    def test_concurrent_queries_share_error(self):
+        pending = Future()
+        with mock.patch.object(self.braspag, 'fetch', return_value=pending) as fetch:
+            futures = [
+                self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+                for _ in range(3)
+            ]
+            pending.set_exception(HTTPTimeoutError(599))
+
+            for future in futures:
+                with self.assertRaises(HTTPTimeoutError):
+                    yield future
+
+        assert fetch.call_count == 1
+
+    @gen_test
+    def test_sequential_queries_are_not_coalesced(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = lambda xml, url, **kwargs: recorded_response('test_get_transaction_data', 1)
+            first = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+            second = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert fetch.call_count == 2
+        assert first is not second
+
+    @gen_test
+    def test_queries_after_a_capture_are_not_coalesced(self):
+        pending = Future()
+
+        def fetch(xml, url, **kwargs):
+            if 'pagadorQuery' in url:
+                return pending
+            return recorded_response('test_authorize_capture_refund', 1)
+
+        with mock.patch.object(self.braspag, 'fetch', side_effect=fetch) as fetch:
+            before = self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+            yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+            after = self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+            pending.set_result(recorded_response('test_get_transaction_data', 1).result())
+            responses = yield [before, after]
+
+        assert [call[1]['operation'] for call in fetch.call_args_list] == [
+            'get_transaction_data', 'capture', 'get_transaction_data']
+        assert responses[0] is not responses[1]
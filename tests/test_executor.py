@@ -0,0 +1,82 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag import render
+from braspag.response import BraspagOrderDataResponse
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import recorded_response
+
+
+ORDER_ID = u'2cf84e51-c45b-45d9-9f64-554a6e088668'
+
+
+class ExecutorTest(BraspagTestCase):
+
+    def setUp(self):
+        super(ExecutorTest, self).setUp()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(ExecutorTest, self).tearDown()
+
+    def create_request(self, **kwargs):
+        return BraspagRequest(MERCHANT_ID, homologation=True, executor=self.executor, **kwargs)
+
+    @gen_test
+    def test_large_responses_are_parsed_in_executor(self):
+        braspag = self.create_request(offload_threshold=0)
+
+        with mock.patch.object(braspag, 'fetch', return_value=recorded_response('test_get_order_data', 1)), \
+                mock.patch.object(self.executor, 'submit', wraps=self.executor.submit) as submit:
+            response = yield braspag.get_order_data(order_id=ORDER_ID)
+
+        submit.assert_called_once_with(BraspagOrderDataResponse, mock.ANY, lazy=False, compact=False)
+        assert response.success == True
+        assert response.transactions[0]['amount'] == 100000
+
+    @gen_test
+    def test_small_responses_are_parsed_inline(self):
+        braspag = self.create_request()
+
+        with mock.patch.object(braspag, 'fetch', return_value=recorded_response('test_get_order_data', 1)), \
+                mock.patch.object(self.executor, 'submit') as submit:
+            response = yield braspag.get_order_data(order_id=ORDER_ID)
+
+        assert not submit.called
+        assert response.success == True
+
+    @gen_test
+    def test_offload_render(self):
+        braspag = self.create_request(offload_render=True, offload_threshold=float('inf'))
+        context = {'order_id': ORDER_ID, 'request_id': u'782a56e2-2dae-11e2-b3ee-080027d29772'}
+        expected = braspag._render_template('get_braspag_order_data.xml', dict(context))
+
+        with mock.patch.object(braspag, 'fetch', return_value=recorded_response('test_get_order_data', 1)) as fetch, \
+                mock.patch.object(self.executor, 'submit', wraps=self.executor.submit) as submit:
+            yield braspag.get_order_data(**context)
+
+        submit.assert_called_once_with(render.render_template, 'get_braspag_order_data.xml', mock.ANY)
+        assert fetch.call_args[0][0] == expected
+
+    @gen_test
+    def test_process_pool(self):
+        executor = ProcessPoolExecutor(max_workers=1)
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True, executor=executor,
+                                 offload_threshold=0, offload_render=True)
+        try:
+            with mock.patch.object(braspag, 'fetch', return_value=recorded_response('test_get_order_data', 1)):
+                response = yield braspag.get_order_data(order_id=ORDER_ID)
+        finally:
+            executor.shutdown()
+
+        assert response.success == True
+        assert response.transactions[0]['amount'] == 100000
@@ -0,0 +1,112 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import mock
+import vcr
+
+from braspag import export
+
+from .base import MERCHANT_ID
+from .vcrutils import CASSETTES_DIR
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+OTHER_TRANSACTION_ID = u'53a90294-e8b4-4e63-9f83-1e69ac387034'
+ORDER_ID = u'2cf84e51-c45b-45d9-9f64-554a6e088668'
+
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_export(self, lines, *args):
+        stdout = StringIO()
+        argv = ['--merchant-id', MERCHANT_ID, '--homologation'] + list(args)
+        exit_code = export.main(argv, stdin=StringIO(u'\n'.join(lines)), stdout=stdout)
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        return exit_code, sorted(results, key=lambda result: result['id'])
+
+    def patch_fetch(self, cassette, index):
+        return mock.patch('braspag.core.BaseRequest.fetch',
+                          side_effect=lambda xml, url, **kwargs: recorded_response(cassette, index))
+
+    def test_export_transactions(self):
+        with self.patch_fetch('test_get_transaction_data', 1) as fetch:
+            exit_code, results = self.run_export([TRANSACTION_ID, '', OTHER_TRANSACTION_ID])
+
+        assert exit_code == 0
+        assert fetch.call_count == 2
+        assert [result['id'] for result in results] == [TRANSACTION_ID, OTHER_TRANSACTION_ID]
+        assert results[0]['success'] == True
+        assert results[0]['errors'] == []
+        assert results[0]['transaction']['amount'] == 100000
+        assert results[0]['transaction']['status_message'] == u'Authorized'
+
+    def test_export_orders(self):
+        with self.patch_fetch('test_get_order_data', 1):
+            exit_code, results = self.run_export([ORDER_ID], '--orders')
+
+        assert exit_code == 0
+        assert results[0]['id'] == ORDER_ID
+        assert results[0]['transactions'][0]['amount'] == 100000
+        assert results[0]['transactions'][0]['received_date'] == u'2018-10-25T23:35:52'
+
+    def test_errors(self):
+        with self.patch_fetch('test_get_transaction_data', 1):
+            exit_code, results = self.run_export([TRANSACTION_ID, 'invalid'])
+
+        assert exit_code == 1
+        assert results[1] == {'id': 'invalid', 'error': u'AssertionError: Invalid Order ID'}
+
+    def test_checkpoint(self):
+        checkpoint = os.path.join(self.tmp_dir, 'checkpoint')
+
+        with self.patch_fetch('test_get_transaction_data', 1):
+            exit_code, results = self.run_export([TRANSACTION_ID, 'invalid'], '--checkpoint', checkpoint)
+        assert len(results) == 2
+        with open(checkpoint) as f:
+            assert f.read() == TRANSACTION_ID + '\n'
+
+        # resumed, only the new and failed ids are queried
+        with self.patch_fetch('test_get_transaction_data', 1) as fetch:
+            exit_code, results = self.run_export(
+                [TRANSACTION_ID.upper(), 'invalid', OTHER_TRANSACTION_ID], '--checkpoint', checkpoint)
+
+        assert fetch.call_count == 1
+        assert [result['id'] for result in results] == [OTHER_TRANSACTION_ID, 'invalid']
+        assert export.load_checkpoint(checkpoint) == set([TRANSACTION_ID, OTHER_TRANSACTION_ID])
+
+    def test_input_file(self):
+        path = os.path.join(self.tmp_dir, 'ids.txt')
+        with open(path, 'w') as f:
+            f.write(TRANSACTION_ID + '\n')
+
+        with self.patch_fetch('test_get_transaction_data', 1):
+            exit_code, results = self.run_export([], path)
+
+        assert [result['id'] for result in results] == [TRANSACTION_ID]
+
+    def test_recorded_cassette(self):
+        cassette = os.path.join(CASSETTES_DIR, 'test_get_transaction_data.yml')
+        with vcr.use_cassette(cassette, record_mode='none'):
+            exit_code, results = self.run_export([TRANSACTION_ID])
+
+        assert exit_code == 0
+        assert results[0]['transaction']['braspag_transaction_id'] == TRANSACTION_ID
+
+    def test_merchant_id_is_required(self):
+        with mock.patch.dict(os.environ, clear=True), mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                export.main([])
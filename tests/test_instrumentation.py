@@ -0,0 +1,168 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import subprocess
+import sys
+import unittest
+
+import mock
+from tornado.httpclient import HTTPError
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.exceptions import HTTPTimeoutError
+from braspag.instrumentation import Instrumentation
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import failed_response
+from .vcrutils import recorded_response
+
+try:
+    from braspag.extensions.newrelic.instrumentation import NewRelicInstrumentation
+except ImportError:
+    NewRelicInstrumentation = None
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+class RecordingInstrumentation(Instrumentation):
+
+    def __init__(self):
+        self.started = []
+        self.finished = []
+
+    def start(self, call):
+        self.started.append(call)
+        return len(self.started)
+
+    def finish(self, call, state):
+        self.finished.append((call, state))
+
+
+class BrokenInstrumentation(Instrumentation):
+
+    def start(self, call):
+        raise ValueError('start')
+
+    def finish(self, call, state):
+        raise ValueError('finish')
+
+
+class InstrumentationTest(BraspagTestCase):
+
+    def setUp(self):
+        super(InstrumentationTest, self).setUp()
+        self.instrumentation = RecordingInstrumentation()
+        self.braspag = BraspagRequest(MERCHANT_ID, homologation=True,
+                                      instrumentation=[self.instrumentation])
+
+    @gen_test
+    def test_successful_call(self):
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            response = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert response.success == True
+        assert len(self.instrumentation.started) == 1
+        call, state = self.instrumentation.finished[0]
+        assert state == 1
+        assert call.operation == 'get_transaction_data'
+        assert call.url == 'https://transactionsandbox.pagador.com.br/services/pagadorQuery.asmx'
+        assert call.method == 'POST'
+        assert call.status == 200
+        assert call.response.code == 200
+        assert call.error is None
+        assert call.duration >= 0
+
+    @gen_test
+    def test_timeout(self):
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.side_effect = lambda request: failed_response(HTTPError(599))
+            with self.assertRaises(HTTPTimeoutError):
+                yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+        call, state = self.instrumentation.finished[0]
+        assert call.operation == 'capture'
+        assert call.status == 599
+        assert isinstance(call.error, HTTPTimeoutError)
+        assert call.response is None
+
+    @gen_test
+    def test_connection_error(self):
+        error = IOError('refused')
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.side_effect = lambda request: failed_response(error)
+            with self.assertRaises(IOError):
+                yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+        call, state = self.instrumentation.finished[0]
+        assert call.status is None
+        assert call.error is error
+
+    @gen_test
+    def test_broken_instrumentation_does_not_fail_the_call(self):
+        self.braspag.instrumentation.insert(0, BrokenInstrumentation())
+        with mock.patch.object(self.braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            response = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert response.success == True
+        assert logger.exception.call_count == 2
+        call, state = self.instrumentation.finished[0]
+        assert state == 1
+
+    def test_no_instrumentation_by_default(self):
+        assert BraspagRequest(MERCHANT_ID, homologation=True).instrumentation == []
+
+    def test_newrelic_is_not_imported(self):
+        code = 'import sys, braspag; assert "newrelic" not in sys.modules'
+        subprocess.check_call([sys.executable, '-c', code])
+
+
+@unittest.skipIf(NewRelicInstrumentation is None, 'requires the newrelic extra')
+class NewRelicInstrumentationTest(BraspagTestCase):
+
+    @gen_test
+    def test_external_trace(self):
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True,
+                                 instrumentation=[NewRelicInstrumentation()])
+        module = 'braspag.extensions.newrelic.instrumentation'
+        with mock.patch.object(braspag, 'http_client') as http_client, \
+                mock.patch(module + '.current_transaction') as current_transaction, \
+                mock.patch(module + '.ExternalTrace') as trace:
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            yield braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        trace.assert_called_once_with(
+            current_transaction.return_value, 'tornado.httpclient',
+            'https://transactionsandbox.pagador.com.br/services/pagadorQuery.asmx', 'POST')
+        assert trace.return_value.__enter__.called
+        trace.return_value.__exit__.assert_called_once_with(None, None, None)
+
+    def test_without_transaction(self):
+        module = 'braspag.extensions.newrelic.instrumentation'
+        with mock.patch(module + '.current_transaction', return_value=None), \
+                mock.patch(module + '.ExternalTrace') as trace:
+            instrumentation = NewRelicInstrumentation()
+            state = instrumentation.start(mock.Mock())
+            instrumentation.finish(mock.Mock(), state)
+
+        assert not trace.called
+
+    @gen_test
+    def test_error_is_given_to_the_trace(self):
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True,
+                                 instrumentation=[NewRelicInstrumentation()])
+        error = IOError('refused')
+        module = 'braspag.extensions.newrelic.instrumentation'
+        with mock.patch.object(braspag, 'http_client') as http_client, \
+                mock.patch(module + '.current_transaction'), \
+                mock.patch(module + '.ExternalTrace') as trace:
+            http_client.fetch.side_effect = lambda request: failed_response(error)
+            with self.assertRaises(IOError):
+                yield braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+        trace.return_value.__exit__.assert_called_once_with(IOError, error, None)
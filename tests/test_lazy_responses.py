@@ -0,0 +1,81 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.response import BraspagOrderDataResponse
+from braspag.response import CreditCardAuthorizationResponse
+from braspag.response import TransactionDataResponse
+from braspag.utils import extract_dict
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import recorded_body
+from .vcrutils import recorded_response
+
+
+class LazyResponseTest(BraspagTestCase):
+
+    def test_lazy_response_matches_eager_response(self):
+        for response_class, cassette, index in ((CreditCardAuthorizationResponse, 'test_authorize', 0),
+                                                (BraspagOrderDataResponse, 'test_get_order_data', 1),
+                                                (TransactionDataResponse, 'test_get_transaction_data', 1)):
+            body = recorded_body(cassette, index)
+            eager = response_class(body)
+            lazy = response_class(body, lazy=True)
+
+            assert lazy.success == eager.success
+            assert lazy.errors == eager.errors
+            assert vars(lazy) == vars(eager)
+
+    def test_transactions_are_loaded_on_first_access(self):
+        body = recorded_body('test_get_order_data', 1)
+
+        response = BraspagOrderDataResponse(body, lazy=True)
+        assert response.success == True
+        assert response.correlation_id == u'd217499e-2a04-475b-95ac-ecc12236c601'
+        assert 'transactions' not in vars(response)
+
+        with mock.patch.object(response, 'load', wraps=response.load) as load:
+            assert len(response.transactions) == 1
+            assert response.errors == []
+            assert load.call_count == 1
+
+    def test_result_is_extracted_on_first_access(self):
+        body = recorded_body('test_get_order_data', 1)
+
+        with mock.patch('braspag.response.extract_dict', wraps=extract_dict) as extract:
+            response = BraspagOrderDataResponse(body, lazy=True)
+            assert response.success == True
+            assert not extract.called
+
+            assert len(response.transactions) == 1
+            extract.assert_called_once_with(body, BraspagOrderDataResponse.RESULT_PATH)
+
+    def test_missing_attribute(self):
+        response = TransactionDataResponse(recorded_body('test_get_transaction_data', 1), lazy=True)
+
+        with self.assertRaises(AttributeError):
+            response.transactions
+        assert response.transaction['amount'] == 100000
+
+        with self.assertRaises(AttributeError):
+            response.order_id
+
+
+class LazyResponsesRequestTest(BraspagTestCase):
+
+    @gen_test
+    def test_lazy_responses_option(self):
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True, lazy_responses=True)
+        fetch = mock.patch.object(braspag, 'fetch',
+                                  return_value=recorded_response('test_get_order_data', 1))
+
+        with fetch:
+            response = yield braspag.get_order_data(order_id=u'2cf84e51-c45b-45d9-9f64-554a6e088668')
+
+        assert response.success == True
+        assert 'transactions' not in vars(response)
+        assert response.transactions[0]['amount'] == 100000
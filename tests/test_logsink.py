@@ -0,0 +1,208 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import logging
+import os
+import threading
+import unittest
+
+import mock
+from tornado.httpclient import HTTPError
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.logsink import PayloadLogging, QueueLogHandler, install_queue_handler
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import failed_response
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class BlockedHandler(RecordingHandler):
+
+    def __init__(self):
+        RecordingHandler.__init__(self)
+        self.released = threading.Event()
+
+    def emit(self, record):
+        self.released.wait()
+        RecordingHandler.emit(self, record)
+
+
+class QueueLogHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('braspag.tests.logsink')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
+
+    def test_records_are_written_by_the_target_handlers(self):
+        target = RecordingHandler()
+        warnings = RecordingHandler(logging.WARNING)
+        self.logger.addHandler(target)
+        self.logger.addHandler(warnings)
+        handler = install_queue_handler(self.logger)
+
+        assert self.logger.handlers == [handler]
+
+        self.logger.info(u'info %s', 1)
+        self.logger.warning(u'warning')
+        handler.close()
+
+        assert [r.getMessage() for r in target.records] == [u'info 1', u'warning']
+        assert [r.getMessage() for r in warnings.records] == [u'warning']
+
+    def test_exception_is_formatted_before_queueing(self):
+        target = RecordingHandler()
+        handler = QueueLogHandler([target])
+        self.logger.addHandler(handler)
+
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            self.logger.exception(u'failed')
+        handler.close()
+
+        record = target.records[0]
+        assert record.exc_info is None
+        assert 'ValueError: boom' in record.exc_text
+
+    def test_full_queue_drops_records(self):
+        target = BlockedHandler()
+        handler = QueueLogHandler([target], max_size=1)
+        self.logger.addHandler(handler)
+
+        # the first record may be held by the writer thread
+        for i in range(5):
+            self.logger.info(u'record %s', i)
+        target.released.set()
+        handler.close()
+
+        assert handler.dropped >= 3
+        assert len(target.records) + handler.dropped == 5
+
+
+    def test_fork(self):
+        target = RecordingHandler()
+        handler = QueueLogHandler([target])
+        self.logger.addHandler(handler)
+
+        pid = os.fork()
+        if pid == 0:
+            # the writer thread of the parent does not exist in the child
+            try:
+                self.logger.info(u'child')
+                handler.close()
+                ok = ([r.getMessage() for r in target.records] == [u'child'] and
+                      handler.dropped == 0)
+            except BaseException:
+                ok = False
+            os._exit(0 if ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
+
+        self.logger.info(u'parent')
+        handler.close()
+        assert [r.getMessage() for r in target.records] == [u'parent']
+
+
+class PayloadLoggingTest(unittest.TestCase):
+
+    def test_sample_rates_by_operation(self):
+        payload_logging = PayloadLogging(sample_rate=0.5, sample_rates={
+            'get_transaction_data': 0,
+            'authorize': 1,
+        }, random=lambda: 0.25)
+
+        assert payload_logging.sample('capture')
+        assert payload_logging.sample('authorize')
+        assert not payload_logging.sample('get_transaction_data')
+        assert not PayloadLogging(sample_rate=0.1, random=lambda: 0.25).sample('capture')
+
+    def test_truncate(self):
+        payload_logging = PayloadLogging(max_body_size=5)
+
+        assert payload_logging.truncate(u'12345') == u'12345'
+        assert payload_logging.truncate(u'1234567') == u'12345... (7 characters)'
+        assert PayloadLogging().truncate(u'1234567') == u'1234567'
+
+
+class RequestPayloadLoggingTest(BraspagTestCase):
+
+    def setUp(self):
+        super(RequestPayloadLoggingTest, self).setUp()
+        self.payload_logging = PayloadLogging(max_body_size=20)
+        self.braspag = BraspagRequest(MERCHANT_ID, homologation=True,
+                                      payload_logging=self.payload_logging)
+
+    @gen_test
+    def test_payloads_are_truncated(self):
+        with mock.patch.object(self.braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            logger.isEnabledFor.return_value = True
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        request_log, response_log = [c[0][0] for c in logger.info.call_args_list]
+        assert request_log.startswith(u'URL: ')
+        assert request_log.endswith(u' characters)')
+        assert response_log.startswith(u'Response code: 200 body: ')
+        assert response_log.endswith(u' characters)')
+
+    @gen_test
+    def test_sampled_out_calls_are_not_logged(self):
+        self.payload_logging.sample_rates['get_transaction_data'] = 0
+        with mock.patch.object(self.braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            logger.isEnabledFor.return_value = True
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            response = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert response.success == True
+        assert not logger.info.called
+
+    @gen_test
+    def test_errors_are_always_logged(self):
+        self.payload_logging.sample_rate = 0
+        with mock.patch.object(self.braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            logger.isEnabledFor.return_value = True
+            http_client.fetch.side_effect = lambda request: failed_response(HTTPError(500))
+            with self.assertRaises(HTTPError):
+                yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+        assert not logger.info.called
+        assert logger.error.call_count == 1
+        assert u'characters)' in logger.error.call_args[0][0]
+
+    @gen_test
+    def test_connection_errors_are_logged(self):
+        with mock.patch.object(self.braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            logger.isEnabledFor.return_value = True
+            http_client.fetch.side_effect = lambda request: failed_response(IOError('refused'))
+            with self.assertRaises(IOError):
+                yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+        assert logger.error.call_count == 1
+        assert u'refused' in logger.error.call_args[0][0]
@@ -0,0 +1,193 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import random
+import unittest
+
+import mock
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPError
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.web import Application
+
+from braspag import BraspagRequest, ProtectedCardRequest
+from braspag.exceptions import HTTPTimeoutError
+from braspag.metrics import Histogram, Metrics, MetricsHandler, render_prometheus
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import failed_response
+from .vcrutils import recorded_response
+from .vcrutils import response_future
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+GET_CUSTOMER_DATA_ERROR = b'''<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>
+<GetCustomerDataResponse xmlns="https://www.pagador.com.br/query/pagadorquery">
+<GetCustomerDataResult><CorrelationId>4d0aea6b-5ff2-47e7-946f-159569b28f8f</CorrelationId>
+<Success>false</Success><ErrorReportDataCollection><ErrorReportDataResponse>
+<ErrorCode>122</ErrorCode><ErrorMessage>Invalid BraspagTransactionId</ErrorMessage>
+</ErrorReportDataResponse></ErrorReportDataCollection></GetCustomerDataResult>
+</GetCustomerDataResponse></soap:Body></soap:Envelope>'''
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_small_values_are_exact(self):
+        histogram = Histogram(precision_bits=7)
+        for value in range(1, 101):
+            histogram.record(value)
+
+        assert histogram.percentile(0.5) == 50
+        assert histogram.percentile(0.99) == 99
+        assert histogram.percentile(1) == 100
+        assert histogram.count == 100
+        assert histogram.total == 5050
+        assert (histogram.min, histogram.max) == (1, 100)
+
+    def test_relative_error(self):
+        histogram = Histogram(precision_bits=7)
+        values = sorted(random.randint(1, 10 ** 8) for _ in range(1000))
+        for value in values:
+            histogram.record(value)
+
+        for quantile in (0.5, 0.9, 0.99, 0.999):
+            expected = values[int(round(quantile * len(values))) - 1]
+            assert expected <= histogram.percentile(quantile) <= expected * (1 + 1 / 64.0)
+
+    def test_empty(self):
+        assert Histogram().percentile(0.5) is None
+
+
+class MetricsTest(BraspagTestCase):
+
+    def setUp(self):
+        super(MetricsTest, self).setUp()
+        self.metrics = Metrics()
+        self.braspag = BraspagRequest(MERCHANT_ID, homologation=True,
+                                      instrumentation=[self.metrics])
+
+    @gen_test
+    def test_successful_call(self):
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        metrics = self.metrics.snapshot()['get_transaction_data']
+        assert metrics['latency']['count'] == 1
+        assert metrics['latency']['p50'] == metrics['latency']['max']
+        assert metrics['outcomes'] == {'success': 1}
+        assert metrics['bytes_sent'] > 0
+        assert metrics['bytes_received'] == len(http_client.fetch.return_value.result().body)
+        assert metrics['in_flight'] == 0
+
+    @gen_test
+    def test_braspag_error(self):
+        protected_card = ProtectedCardRequest(MERCHANT_ID, homologation=True,
+                                              instrumentation=[self.metrics])
+        with mock.patch.object(protected_card, 'http_client') as http_client:
+            http_client.fetch.return_value = recorded_response('test_add_card_without_required_field', 0)
+            yield protected_card.add_card(
+                customer_identification='123',
+                customer_name='Joao da Silva',
+                card_holder='Joao Silva',
+                card_number='0000000000000001',
+                card_expiration='05/2018',
+            )
+
+        metrics = self.metrics.snapshot()['add_card']
+        assert metrics['outcomes'] == {'braspag_error': 1}
+        assert metrics['error_codes'] == {u'749': 1}
+
+    @gen_test
+    def test_pagador_response_error(self):
+        with mock.patch.object(self.braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            http_client.fetch.return_value = response_future(GET_CUSTOMER_DATA_ERROR)
+            response = yield self.braspag.get_customer_data(order_id=TRANSACTION_ID)
+
+        assert response.errors == [(122, u'Invalid BraspagTransactionId')]
+        metrics = self.metrics.snapshot()['get_customer_data']
+        assert metrics['outcomes'] == {'braspag_error': 1}
+        assert metrics['error_codes'] == {u'122': 1}
+        assert not logger.exception.called
+
+    @gen_test
+    def test_failed_calls(self):
+        errors = [HTTPError(599), HTTPError(500), IOError('refused')]
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.side_effect = lambda request: failed_response(errors.pop(0))
+            for exception in (HTTPTimeoutError, HTTPError, IOError):
+                with self.assertRaises(exception):
+                    yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+        metrics = self.metrics.snapshot()['capture']
+        assert metrics['latency']['count'] == 3
+        assert metrics['outcomes'] == {'timeout': 1, 'http_error': 1, 'connection_error': 1}
+        assert metrics['bytes_received'] == 0
+        assert metrics['in_flight'] == 0
+
+    @gen_test
+    def test_in_flight(self):
+        pending = Future()
+        with mock.patch.object(self.braspag, 'http_client') as http_client:
+            http_client.fetch.return_value = pending
+            call = self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+            yield gen.moment
+            assert self.metrics.snapshot()['get_transaction_data']['in_flight'] == 1
+
+            pending.set_result(recorded_response('test_get_transaction_data', 1).result())
+            yield call
+
+        assert self.metrics.snapshot()['get_transaction_data']['in_flight'] == 0
+
+
+class RenderPrometheusTest(unittest.TestCase):
+
+    SNAPSHOT = {
+        'capture': {
+            'latency': {'count': 2, 'sum': 0.5, 'min': 0.2, 'max': 0.3,
+                        'p50': 0.2, 'p99': 0.3, 'p999': 0.3},
+            'outcomes': {'success': 1, 'braspag_error': 1},
+            'error_codes': {u'1"2': 1},
+            'bytes_sent': 1024,
+            'bytes_received': 512,
+            'in_flight': 1,
+        },
+    }
+
+    def test_render(self):
+        lines = render_prometheus(self.SNAPSHOT).splitlines()
+
+        assert u'# TYPE braspag_request_duration_seconds summary' in lines
+        assert u'braspag_request_duration_seconds{operation="capture",quantile="0.99"} 0.3' in lines
+        assert u'braspag_request_duration_seconds_sum{operation="capture"} 0.5' in lines
+        assert u'braspag_request_duration_seconds_count{operation="capture"} 2' in lines
+        assert u'braspag_requests_total{operation="capture",outcome="braspag_error"} 1' in lines
+        assert u'braspag_errors_total{operation="capture",code="1\\"2"} 1' in lines
+        assert u'braspag_request_bytes_total{operation="capture"} 1024' in lines
+        assert u'braspag_response_bytes_total{operation="capture"} 512' in lines
+        assert u'braspag_in_flight_requests{operation="capture"} 1' in lines
+
+    def test_empty_snapshot(self):
+        snapshot = Metrics().snapshot()
+        assert render_prometheus(snapshot).startswith(u'# HELP braspag_request_duration_seconds ')
+
+
+class MetricsHandlerTest(AsyncHTTPTestCase):
+
+    def get_app(self):
+        self.metrics = mock.Mock()
+        self.metrics.render_prometheus.return_value = u'braspag_in_flight_requests{operation="capture"} 0\n'
+        return Application([(r'/metrics', MetricsHandler, {'metrics': self.metrics})])
+
+    def test_get(self):
+        response = self.fetch('/metrics')
+
+        assert response.code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert response.body == b'braspag_in_flight_requests{operation="capture"} 0\n'
@@ -1,6 +1,7 @@
 # -*- coding: utf8 -*-
 from __future__ import absolute_import
 from copy import deepcopy
+import logging
 
 import mock
 from tornado.testing import gen_test
@@ -71,7 +72,8 @@ class ProtectedCardTest(BraspagTestCase):
     @gen_test
     @replay
     def test_should_mask_sensible_data_on_request_log(self):
-        with mock.patch('braspag.core.logger.info') as mock_log:
+        with mock.patch('braspag.core.logger.info') as mock_log, \
+                mock.patch('braspag.core.logger.level', logging.INFO):
             response = yield self.protected_card.add_card(
                 **self.add_card_payload
             )
@@ -86,7 +88,8 @@ class ProtectedCardTest(BraspagTestCase):
     def test_should_mask_sensible_data_on_response_log(self):
         response = yield self.protected_card.add_card(**self.add_card_payload)
 
-        with mock.patch('braspag.core.logger.info') as mock_log:
+        with mock.patch('braspag.core.logger.info') as mock_log, \
+                mock.patch('braspag.core.logger.level', logging.INFO):
             response = yield self.protected_card.get_card(**{
                 'just_click_key': response.just_click_key
             })
@@ -95,3 +98,13 @@ class ProtectedCardTest(BraspagTestCase):
 
         assert mock_log.called
         assert u'<CardNumber>100000******0001</CardNumber>' in response_log[0]
+
+    @gen_test
+    @replay
+    def test_should_not_mask_data_when_info_is_disabled(self):
+        with mock.patch('braspag.core.mask_card_data_from_xml') as mask, \
+                mock.patch('braspag.core.logger.level', logging.WARNING):
+            response = yield self.protected_card.add_card(**self.add_card_payload)
+
+        assert response.success == True
+        assert not mask.called
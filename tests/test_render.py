@@ -0,0 +1,89 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import shutil
+import tempfile
+
+import jinja2
+
+from braspag import BraspagRequest
+from braspag import render
+from braspag.core import BraspagTransaction
+from braspag.utils import spaceless
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+
+
+class RenderTest(BraspagTestCase):
+
+    def tearDown(self):
+        render.configure()
+        super(RenderTest, self).tearDown()
+
+    def test_environment_is_shared(self):
+        other = BraspagRequest(MERCHANT_ID, homologation=True)
+
+        assert other.jinja_env is self.braspag.jinja_env
+        assert not render.get_environment().auto_reload
+        assert render.get_template('base.xml') is render.get_template('base.xml')
+
+    def test_precompiled_templates(self):
+        context = {
+            'type': 'Capture',
+            'transactions': [{'transaction_id': u'abc', 'amount': 10}],
+            'request_id': u'782a56e2-2dae-11e2-b3ee-080027d29772',
+        }
+        expected = self.braspag._render_template('base.xml', dict(context))
+
+        target = tempfile.mkdtemp()
+        try:
+            render.compile_templates(target)
+            render.configure(modules_path=target)
+            template = render.get_template('base.xml')
+
+            assert template.filename.startswith(target)
+            assert self.braspag._render_template('base.xml', dict(context)) == expected
+        finally:
+            shutil.rmtree(target)
+
+    def test_output_matches_spaceless_rendering(self):
+        environment = jinja2.Environment(autoescape=True, loader=jinja2.PackageLoader('braspag'))
+        address = {
+            'street': u'Rua da Consola\xe7\xe3o',
+            'number': u'10\n  A',
+            'complement': u'',
+            'district': u' Centro ',
+            'zipcode': u'01000-000',
+        }
+        transaction = BraspagTransaction(
+            amount=1000,
+            card_holder=u'Jos\xe9 <da> Silva',
+            card_number=u'0000000000000001',
+            card_security_code=u'123',
+            card_exp_date=u'05/2018',
+            payment_method=997,
+            soft_descriptor=u'Sax & Alto',
+        )
+        contexts = [
+            ('authorize.xml', {'transactions': [transaction], 'customer_address': address,
+                               'delivery_address': address, 'customer_name': u'A\r\nB'}),
+            ('authorize.xml', {'is_billet': True, 'boleto_number': u'123',
+                               'boleto_instructions': u'Pay\n\n   until\ntomorrow  '}),
+            ('authorize_billet.xml', {'is_billet': True, 'boleto_number': u'123'}),
+            ('base.xml', {'type': 'Void', 'transactions': [{'transaction_id': u'a', 'amount': 1}] * 2}),
+            ('add_card.xml', {'customer_name': u'Jos\xe9', 'card_number': u'1'}),
+            ('get_card.xml', {'just_click_key': u'k', 'just_click_alias': None}),
+            ('invalidate_card.xml', {'just_click_key': u'k'}),
+            ('get_customer_data.xml', {'order_id': u'o'}),
+            ('get_transaction_data.xml', {'transaction_id': u't'}),
+            ('get_braspag_order_id.xml', {'transaction_id': u't'}),
+            ('get_braspag_order_data.xml', {'order_id': u'o'}),
+            ('get_braspag_order_id_by_order.xml', {'order_id': u'o'}),
+        ]
+
+        for template_name, context in contexts:
+            context.update(merchant_id=u'm', request_id=u'r')
+            expected = spaceless(environment.get_template(template_name).render(context))
+
+            assert render.render_template(template_name, context) == expected, template_name
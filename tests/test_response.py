@@ -0,0 +1,55 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+from braspag.response import BraspagOrderIdResponse
+from braspag.response import CustomerDataResponse
+
+from .base import BraspagTestCase
+from .vcrutils import recorded_body
+
+
+ERROR_RESPONSE = (
+    '<?xml version="1.0" encoding="utf-8"?><soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<soap:Body><GetCustomerDataResponse xmlns="https://www.pagador.com.br/query/pagadorquery">'
+    '<GetCustomerDataResult><CorrelationId>782a56e2-2dae-11e2-b3ee-080027d29772</CorrelationId>'
+    '<Success>false</Success><ErrorReportDataCollection>'
+    '<ErrorReportDataResponse><ErrorCode>122</ErrorCode><ErrorMessage>Invalid OrderId</ErrorMessage>'
+    '</ErrorReportDataResponse><ErrorReportDataResponse><ErrorCode>122</ErrorCode>'
+    '<ErrorMessage>Invalid OrderId</ErrorMessage></ErrorReportDataResponse>'
+    '</ErrorReportDataCollection></GetCustomerDataResult></GetCustomerDataResponse></soap:Body></soap:Envelope>'
+)
+
+FAULT_RESPONSE = (
+    '<?xml version="1.0" encoding="utf-8"?><soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<soap:Body><soap:Fault><faultcode>soap:Server</faultcode><faultstring>Server was unable to process request.'
+    '</faultstring></soap:Fault></soap:Body></soap:Envelope>'
+)
+
+
+class PagadorResponseTest(BraspagTestCase):
+
+    def test_recorded_responses(self):
+        response = CustomerDataResponse(recorded_body('test_get_customer_data', 2))
+
+        assert response.success == True
+        assert response.customer_name == u'José da Silva'
+        assert response.customer_identity == u'12345678900'
+        assert response.errors == []
+
+        response = BraspagOrderIdResponse(recorded_body('test_get_customer_data', 1))
+
+        assert response.success == True
+        assert response.braspag_order_id is not None
+
+    def test_errors(self):
+        response = CustomerDataResponse(ERROR_RESPONSE)
+
+        assert response.success == False
+        assert response.customer_name is None
+        assert response.errors == [(122, 'Invalid OrderId')]
+
+    def test_soap_fault(self):
+        response = CustomerDataResponse(FAULT_RESPONSE)
+
+        assert response.success is None
+        assert response.errors == [[0, 'Server was unable to process request.']]
@@ -0,0 +1,117 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from tornado.httpclient import HTTPError
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.exceptions import HTTPTimeoutError
+from braspag.retry import RetryPolicy
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import failed_response
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+class RetryPolicyTest(BraspagTestCase):
+
+    def test_exponential_backoff(self):
+        policy = RetryPolicy(backoff=0.1, max_backoff=0.3, jitter=0)
+
+        assert policy.get_delay(1) == 0.1
+        assert policy.get_delay(2) == 0.2
+        assert policy.get_delay(3) == 0.3
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff=1, jitter=0.5)
+
+        assert all(0.5 <= policy.get_delay(1) <= 1 for _ in range(100))
+
+    def test_should_retry(self):
+        policy = RetryPolicy(max_attempts=2)
+
+        assert policy.should_retry(HTTPTimeoutError(599), 1)
+        assert policy.should_retry(HTTPError(503), 1)
+        assert policy.should_retry(IOError(), 1)
+        assert not policy.should_retry(HTTPError(400), 1)
+        assert not policy.should_retry(HTTPError(503), 2)
+        assert not policy.should_retry(ValueError(), 1)
+
+
+class RequestRetryTest(BraspagTestCase):
+
+    def setUp(self):
+        super(RequestRetryTest, self).setUp()
+        policy = RetryPolicy(backoff=0)
+        self.braspag = BraspagRequest(MERCHANT_ID, homologation=True, retry_policies={
+            'get_transaction_data': policy,
+            'capture': policy,
+        })
+
+    @gen_test
+    def test_query_is_retried(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = [
+                failed_response(HTTPTimeoutError(599)),
+                failed_response(HTTPError(503)),
+                recorded_response('test_get_transaction_data', 1),
+            ]
+            response = yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert fetch.call_count == 3
+        assert response.success == True
+
+    @gen_test
+    def test_query_gives_up_after_max_attempts(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = lambda xml, url, **kwargs: failed_response(HTTPTimeoutError(599))
+            with self.assertRaises(HTTPTimeoutError):
+                yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert fetch.call_count == 3
+
+    @gen_test
+    def test_query_deadline(self):
+        self.braspag.retry_policies['get_transaction_data'] = RetryPolicy(backoff=1, jitter=0, deadline=0.5)
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = lambda xml, url, **kwargs: failed_response(HTTPTimeoutError(599))
+            with self.assertRaises(HTTPTimeoutError):
+                yield self.braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert fetch.call_count == 1
+
+    @gen_test
+    def test_transaction_is_not_retried_by_default(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = lambda xml, url, **kwargs: failed_response(HTTPTimeoutError(599))
+            with self.assertRaises(HTTPTimeoutError):
+                yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000)
+
+        assert fetch.call_count == 1
+
+    @gen_test
+    def test_transaction_retry_opt_in(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.side_effect = [
+                failed_response(HTTPTimeoutError(599)),
+                recorded_response('test_authorize_capture_refund', 1),
+            ]
+            response = yield self.braspag.capture(
+                transaction_id=TRANSACTION_ID,
+                amount=100000,
+                request_id=u'782a56e2-2dae-11e2-b3ee-080027d29772',
+                retry=True,
+            )
+
+        assert fetch.call_count == 2
+        assert response.success == True
+
+    @gen_test
+    def test_transaction_retry_requires_request_id(self):
+        with self.assertRaises(AssertionError):
+            yield self.braspag.capture(transaction_id=TRANSACTION_ID, amount=100000, retry=True)
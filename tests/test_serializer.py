@@ -0,0 +1,56 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+from braspag import render
+from braspag.serializer import FIXED_TEMPLATES
+
+from .base import BraspagTestCase
+
+
+class FixedTemplateTest(BraspagTestCase):
+
+    CONTEXTS = [
+        {
+            'type': 'Capture',
+            'request_id': u'782a56e2-2dae-11e2-b3ee-080027d29772',
+            'merchant_id': u'F9B44052-4AE0-E311-9406-0026B939D54B',
+            'transactions': [{'transaction_id': u'53a90294', 'amount': 100000}],
+            'transaction_id': u'53a90294-e8b4-4e63-9f83-1e69ac387034',
+            'order_id': u'2cf84e51-c45b-45d9-9f64-554a6e088668',
+            'just_click_key': u'e99d7c94-d3cd-4ef6-aa38-0245703bfbb8',
+            'just_click_alias': u'<Jos\xe9 & "Silva">',
+            'customer_identification': 1,
+            'customer_name': u'Jos\xe9 da Silva',
+            'card_holder': 'Jose da Silva',
+            'card_number': u'1000000000000001',
+            'card_expiration': u'05/2018',
+        },
+        {
+            'type': 'Void',
+            'request_id': None,
+            'merchant_id': u'M',
+            'transactions': ({'transaction_id': u"'a'", 'amount': 0},),
+        },
+    ]
+
+    def test_same_output_as_jinja(self):
+        for template_name in FIXED_TEMPLATES:
+            fixed_template = render.get_fixed_template(template_name)
+            template = render.get_template(template_name)
+
+            for context in self.CONTEXTS:
+                expected = template.render(context)
+                assert fixed_template.render(context) == expected, template_name
+
+    def test_unexpected_shape_falls_back_to_jinja(self):
+        fixed_template = render.get_fixed_template('base.xml')
+        context = {
+            'type': 'Capture',
+            'transactions': [{'transaction_id': u'a', 'amount': 1}, {'transaction_id': u'b', 'amount': 2}],
+        }
+
+        assert fixed_template.render(context) is None
+        assert render.render_template('base.xml', context).count(u'<TransactionDataRequest>') == 2
+
+    def test_complex_templates_are_not_fixed(self):
+        assert render.get_fixed_template('authorize.xml') is None
@@ -0,0 +1,102 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import os
+import threading
+import unittest
+
+import mock
+from concurrent.futures import TimeoutError
+from tornado import gen
+
+from braspag import BraspagRequest
+from braspag.sync import SyncClient
+from braspag.sync import get_loop_thread
+
+from .base import MERCHANT_ID
+from .vcrutils import failed_response
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+class SyncClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = SyncClient(lambda: BraspagRequest(MERCHANT_ID, homologation=True), timeout=5)
+
+    def test_call(self):
+        loop_thread = get_loop_thread()
+        fetch_threads = []
+
+        def fetch(xml, url, **kwargs):
+            fetch_threads.append(threading.current_thread())
+            return recorded_response('test_get_transaction_data', 1)
+
+        with mock.patch.object(self.client.request, 'fetch', side_effect=fetch):
+            response = self.client.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert response.success == True
+        assert response.transaction['amount'] == 100000
+        assert fetch_threads == [loop_thread.thread]
+
+    def test_calls_from_many_threads(self):
+        responses = []
+
+        def call():
+            responses.append(self.client.call('get_transaction_data', transaction_id=TRANSACTION_ID))
+
+        with mock.patch.object(self.client.request, 'fetch',
+                               side_effect=lambda xml, url, **kwargs: recorded_response('test_get_transaction_data', 1)):
+            threads = [threading.Thread(target=call) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(responses) == 20
+        assert all(response.success for response in responses)
+
+    def test_clients_share_loop_and_http_client(self):
+        other = SyncClient(lambda: BraspagRequest(MERCHANT_ID, homologation=True))
+
+        assert other.loop_thread is self.client.loop_thread
+        assert other.request.http_client is self.client.request.http_client
+
+    def test_error(self):
+        with mock.patch.object(self.client.request, 'fetch',
+                               return_value=failed_response(IOError('connection refused'))):
+            with self.assertRaises(IOError):
+                self.client.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+    def test_timeout(self):
+        with mock.patch.object(self.client.request, 'fetch',
+                               side_effect=lambda xml, url, **kwargs: gen.sleep(1)):
+            future = self.client.submit('get_transaction_data', transaction_id=TRANSACTION_ID)
+            with self.assertRaises(TimeoutError):
+                future.result(0.01)
+
+    def test_fork(self):
+        parent_request = self.client.request
+        pid = os.fork()
+        if pid == 0:
+            # the parent loop thread does not exist in the child
+            try:
+                stats = self.client.call('transport_stats', timeout=5)
+                ok = (self.client.request is not parent_request and
+                      self.client.loop_thread.thread.is_alive() and
+                      stats is not None)
+            except BaseException:
+                ok = False
+            os._exit(0 if ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
+        assert self.client.request is parent_request
+
+    def test_unknown_operation(self):
+        with self.assertRaises(AttributeError):
+            self.client.unknown_operation
+        with self.assertRaises(AttributeError):
+            self.client.url
@@ -0,0 +1,127 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+from io import BytesIO
+import unittest
+
+import mock
+from tornado.httpclient import HTTPRequest, HTTPResponse
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest, ProtectedCardRequest
+from braspag.timings import Timings
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import recorded_response
+
+
+TRANSACTION_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+
+def make_response(**kwargs):
+    return HTTPResponse(HTTPRequest('http://localhost/'), 200, buffer=BytesIO(b''), **kwargs)
+
+
+class TimingsTest(unittest.TestCase):
+
+    def test_mark(self):
+        timings = Timings()
+        timings.mark('render')
+        timings.mark('fetch')
+        timings.mark('fetch')
+        timings.finish()
+
+        assert sorted(timings) == ['fetch', 'render', 'total']
+        assert timings['total'] >= timings['render'] + timings['fetch']
+
+    def test_simple_client_response(self):
+        timings = Timings()
+        timings.add_response(make_response(request_time=0.25), 0.5)
+
+        assert timings == {'queue': 0.25, 'request': 0.25}
+
+    def test_curl_client_response(self):
+        timings = Timings()
+        timings.add_response(make_response(request_time=0.5, time_info={
+            'queue': 0.125,
+            'namelookup': 0.0625,
+            'connect': 0.125,
+            'appconnect': 0.25,
+            'pretransfer': 0.25,
+            'starttransfer': 0.375,
+            'total': 0.5,
+            'redirect': 0,
+        }), 0.625)
+
+        assert timings == {
+            'queue': 0.125,
+            'dns': 0.0625,
+            'connect': 0.0625,
+            'tls': 0.125,
+            'server': 0.125,
+            'transfer': 0.125,
+        }
+
+    def test_retried_requests_are_added_up(self):
+        timings = Timings()
+        timings.add_response(make_response(request_time=0.25), 0.25)
+        timings.add_response(make_response(request_time=0.5), 0.5)
+
+        assert timings == {'queue': 0, 'request': 0.75}
+
+    def test_format(self):
+        timings = Timings()
+        timings.update(parse=0.0005, render=0.001, total=1.25)
+
+        assert timings.format() == u'render=0.001s parse=0.001s total=1.250s'
+
+
+class RequestTimingsTest(BraspagTestCase):
+
+    @gen_test
+    def test_timings_are_attached_to_the_response(self):
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True)
+        with mock.patch.object(braspag, 'http_client') as http_client:
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            response = yield braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert set(['render', 'fetch', 'parse', 'total']) <= set(response.timings)
+        assert response.timings['total'] >= response.timings['fetch']
+
+    @gen_test
+    def test_protected_card_timings(self):
+        braspag = ProtectedCardRequest(MERCHANT_ID, homologation=True)
+        with mock.patch.object(braspag, 'http_client') as http_client:
+            http_client.fetch.return_value = recorded_response('test_add_card', 0)
+            response = yield braspag.add_card(
+                customer_identification='123',
+                customer_name='Joao da Silva',
+                card_holder='Joao Silva',
+                card_number='0000000000000001',
+                card_expiration='05/2018',
+            )
+
+        assert set(['render', 'fetch', 'parse', 'total']) <= set(response.timings)
+
+    @gen_test
+    def test_slow_calls_are_logged(self):
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True, slow_call_threshold=0)
+        with mock.patch.object(braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            yield braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        message = logger.warning.call_args[0][0]
+        assert message.startswith(u'Slow call to get_transaction_data: render=')
+        assert u' total=' in message
+
+    @gen_test
+    def test_fast_calls_are_not_logged(self):
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True, slow_call_threshold=60)
+        with mock.patch.object(braspag, 'http_client') as http_client, \
+                mock.patch('braspag.core.logger') as logger:
+            http_client.fetch.return_value = recorded_response('test_get_transaction_data', 1)
+            yield braspag.get_transaction_data(transaction_id=TRANSACTION_ID)
+
+        assert not logger.warning.called
@@ -0,0 +1,121 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import json
+import pickle
+from datetime import datetime
+
+import mock
+from tornado.testing import gen_test
+
+from braspag import BraspagRequest
+from braspag.response import BraspagOrderDataResponse
+from braspag.response import TransactionRecord
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+from .vcrutils import recorded_body
+from .vcrutils import recorded_response
+
+
+ORDER_ID = u'd217499e-2a04-475b-95ac-ecc12236c601'
+
+
+class TransactionRecordTest(BraspagTestCase):
+
+    def setUp(self):
+        super(TransactionRecordTest, self).setUp()
+        response = BraspagOrderDataResponse(recorded_body('test_get_order_data', 1), compact=True)
+        self.transaction = response.transactions[0]
+
+    def test_dict_access(self):
+        transaction = self.transaction
+
+        assert isinstance(transaction, TransactionRecord)
+        assert transaction['amount'] == 100000
+        assert transaction['status_message'] == 'Authorized'
+        assert transaction['received_date'] == datetime(2018, 10, 25, 23, 35, 52)
+        assert transaction.get('payment_method') == 997
+        assert transaction.has_key('card_token')
+        assert 'currency' in transaction
+
+        # optional fields missing from the response
+        assert 'return_code' not in transaction
+        assert not transaction.has_key('voided_date')
+        assert transaction.get('voided_date') is None
+        assert transaction.get('voided_date', 0) == 0
+        with self.assertRaises(KeyError):
+            transaction['voided_date']
+        with self.assertRaises(KeyError):
+            transaction['unknown']
+
+    def test_keys(self):
+        transaction = self.transaction
+
+        assert set(transaction.keys()) == set(transaction.to_dict().keys())
+        assert list(transaction) == transaction.keys()
+        assert len(transaction) == len(transaction.keys())
+        assert dict(transaction.items()) == transaction.to_dict()
+        assert 'voided_date' not in transaction.keys()
+
+    def test_equality(self):
+        transaction = self.transaction
+        data = transaction.to_dict()
+
+        assert transaction == data
+        assert data == transaction
+        assert transaction == TransactionRecord(**data)
+        assert [transaction] == [data]
+
+        data['amount'] = 1
+        assert transaction != data
+        assert transaction != None
+
+    def test_setitem(self):
+        transaction = TransactionRecord()
+        transaction['amount'] = 100
+
+        assert transaction == {'amount': 100}
+        with self.assertRaises(KeyError):
+            transaction['unknown'] = 1
+
+    def test_pickle(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            transaction = pickle.loads(pickle.dumps(self.transaction, protocol))
+
+            assert transaction == self.transaction
+            assert 'voided_date' not in transaction
+
+
+class DictTransactionsTest(BraspagTestCase):
+
+    def setUp(self):
+        super(DictTransactionsTest, self).setUp()
+        response = BraspagOrderDataResponse(recorded_body('test_get_order_data', 1))
+        self.transaction = response.transactions[0]
+
+    def test_transactions_are_dicts_by_default(self):
+        transaction = self.transaction
+
+        assert isinstance(transaction, dict)
+        assert transaction == BraspagOrderDataResponse(
+            recorded_body('test_get_order_data', 1), compact=True).transactions[0]
+        assert 'voided_date' not in transaction
+
+    def test_mutable_and_serializable(self):
+        transaction = self.transaction.copy()
+        transaction.update(note=u'checked')
+        transaction['received_date'] = transaction['received_date'].isoformat()
+
+        assert json.loads(json.dumps([transaction]))[0]['note'] == u'checked'
+
+    @gen_test
+    def test_compact_transactions_option(self):
+        for compact in (False, True):
+            braspag = BraspagRequest(MERCHANT_ID, homologation=True, compact_transactions=compact)
+            with mock.patch.object(braspag, 'http_client') as http_client:
+                http_client.fetch.return_value = recorded_response('test_get_order_data', 1)
+                response = yield braspag.get_order_data(order_id=ORDER_ID)
+
+            assert isinstance(response.transactions[0], TransactionRecord) == compact
+            assert response.transactions[0]['amount'] == 100000
@@ -0,0 +1,74 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import gc
+import weakref
+
+from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
+from tornado.simple_httpclient import SimpleAsyncHTTPClient
+
+from braspag import BraspagRequest
+from braspag import ProtectedCardRequest
+from braspag.transport import Transport
+
+from .base import BraspagTestCase
+from .base import MERCHANT_ID
+
+
+class TransportTest(BraspagTestCase):
+
+    def test_default_transport_uses_shared_client(self):
+        assert self.braspag.http_client is AsyncHTTPClient()
+        assert self.braspag.transport.is_default
+
+    def test_custom_pool_size(self):
+        transport = Transport(max_clients=50)
+        request = BraspagRequest(MERCHANT_ID, homologation=True, transport=transport)
+
+        assert isinstance(request.http_client, SimpleAsyncHTTPClient)
+        assert request.http_client is not AsyncHTTPClient()
+        assert request.http_client.max_clients == 50
+
+    def test_shared_transport_shares_pool(self):
+        transport = Transport(max_clients=20)
+        braspag = BraspagRequest(MERCHANT_ID, homologation=True, transport=transport)
+        protected_card = ProtectedCardRequest(MERCHANT_ID, homologation=True, transport=transport)
+
+        assert braspag.http_client is protected_card.http_client
+
+    def test_clients_of_closed_loops_are_released(self):
+        transport = Transport(max_clients=20)
+        closed_loops = []
+        for _ in range(5):
+            io_loop = IOLoop(make_current=False)
+            io_loop.make_current()
+            try:
+                transport.create_client()
+            finally:
+                self.io_loop.make_current()
+            io_loop.close()
+            closed_loops.append(weakref.ref(io_loop))
+        del io_loop
+
+        client = transport.create_client()
+        gc.collect()
+
+        assert transport._clients == {id(self.io_loop): client}
+        assert [ref() for ref in closed_loops] == [None] * 5
+        assert transport.create_client() is client
+
+    def test_transport_stats(self):
+        request = BraspagRequest(MERCHANT_ID, homologation=True,
+                                 transport=Transport(max_clients=30))
+
+        assert request.transport_stats() == {
+            'backend': 'simple',
+            'max_clients': 30,
+            'active': 0,
+            'queued': 0,
+        }
+
+    def test_invalid_backend(self):
+        with self.assertRaises(AssertionError):
+            Transport(backend='urllib')
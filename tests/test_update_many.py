@@ -0,0 +1,64 @@
+# -*- coding: utf8 -*-
+from __future__ import absolute_import
+
+import mock
+from tornado.testing import gen_test
+
+from .base import BraspagTestCase
+from .vcrutils import response_future
+
+
+FIRST_ID = u'53a90294-e8b4-4e63-9f83-1e69ac387034'
+SECOND_ID = u'2f79d7db-1d47-4950-9a47-e485acdee5e2'
+
+CAPTURE_RESPONSE = (
+    '<?xml version="1.0" encoding="utf-8"?><soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:xsd="http://www.w3.org/2001/XMLSchema">'
+    '<soap:Body><CaptureCreditCardTransactionResponse xmlns="https://www.pagador.com.br/webservice/pagador">'
+    '<CaptureCreditCardTransactionResult><CorrelationId>782a56e2-2dae-11e2-b3ee-080027d29772</CorrelationId>'
+    '<Success>true</Success><ErrorReportDataCollection /><TransactionDataCollection>'
+    '<TransactionDataResponse><BraspagTransactionId>{0}</BraspagTransactionId><AcquirerTransactionId>1025111138636'
+    '</AcquirerTransactionId><Amount>100000</Amount><AuthorizationCode>988742</AuthorizationCode><ReturnCode>6'
+    '</ReturnCode><ReturnMessage>Operation Successful</ReturnMessage><Status>0</Status><ProofOfSale>1139683'
+    '</ProofOfSale></TransactionDataResponse>'
+    '<TransactionDataResponse><BraspagTransactionId>{1}</BraspagTransactionId><AcquirerTransactionId>1025111138637'
+    '</AcquirerTransactionId><Amount>5000</Amount><AuthorizationCode>988743</AuthorizationCode><ReturnCode>6'
+    '</ReturnCode><ReturnMessage>Operation Successful</ReturnMessage><Status>0</Status><ProofOfSale>1139684'
+    '</ProofOfSale></TransactionDataResponse>'
+    '</TransactionDataCollection></CaptureCreditCardTransactionResult></CaptureCreditCardTransactionResponse>'
+    '</soap:Body></soap:Envelope>'
+).format(FIRST_ID, SECOND_ID)
+
+
+class UpdateManyTest(BraspagTestCase):
+
+    @gen_test
+    def test_capture_many(self):
+        with mock.patch.object(self.braspag, 'fetch') as fetch:
+            fetch.return_value = response_future(CAPTURE_RESPONSE)
+            response = yield self.braspag.capture_many(transactions=[
+                (FIRST_ID, 100000),
+                (SECOND_ID, 5000),
+            ])
+
+        xml = fetch.call_args[0][0]
+        assert xml.count(u'<TransactionDataRequest>') == 2
+        assert (u'<BraspagTransactionId>{0}</BraspagTransactionId><Amount>5000</Amount>'.format(SECOND_ID)
+                in xml)
+        assert u'<CaptureCreditCardTransaction ' in xml
+
+        assert fetch.call_count == 1
+        assert response.success == True
+        assert [t['braspag_transaction_id'] for t in response.transactions] == [FIRST_ID, SECOND_ID]
+        assert [t['status_message'] for t in response.transactions] == ['Captured', 'Captured']
+
+    @gen_test
+    def test_void_many_requires_valid_transactions(self):
+        with self.assertRaises(AssertionError):
+            yield self.braspag.void_many(transactions=[(u'foo', 100)])
+
+        with self.assertRaises(AssertionError):
+            yield self.braspag.refund_many(transactions=[(FIRST_ID, '100')])
+
+        with self.assertRaises(AssertionError):
+            yield self.braspag.capture_many(transactions=[])
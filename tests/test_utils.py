@@ -3,14 +3,29 @@
 from __future__ import absolute_import
 
 from datetime import datetime
+from datetime import timedelta
 from braspag.utils import to_bool
 from braspag.utils import to_int
 from braspag.utils import to_date
 from braspag.utils import mask_card_data_from_xml
 from braspag.utils import is_valid_guid
+from braspag.utils import extract_dict
+from braspag.utils import extract_fields
+from braspag.utils import to_unicode
+from braspag import utils
 from .base import BraspagTestCase
 
 
+EXTRACT_XML = (
+    '<?xml version="1.0" encoding="utf-8"?><soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soap:Body>'
+    '<OpResponse xmlns="https://www.pagador.com.br/"><Other><Success>false</Success></Other>'
+    '<OpResult><CorrelationId xsi:nil="true" /><Success>true</Success><Name> Jos\xc3\xa9 &amp; Maria </Name>'
+    '<Collection><Item><Id>1</Id></Item><Item><Id>2</Id><Nested><guid>abc</guid></Nested></Item></Collection>'
+    '</OpResult></OpResponse></soap:Body></soap:Envelope>'
+)
+
+
 class UtilsTest(BraspagTestCase):
 
     def test_utils(self):
@@ -30,6 +45,78 @@ class UtilsTest(BraspagTestCase):
         with self.assertRaises(TypeError):
             to_date(None)
 
+    def test_to_date_matches_strptime(self):
+        values = (
+            '01/01/2015 12:00:00 AM', '12/31/2015 12:59:59 PM', '1/2/2015 1:02:03 pm',
+            u'02/29/2016 11:19:44 PM', '10/25/2018  11:35:52 PM',
+        )
+        for value in values:
+            assert to_date(value) == datetime.strptime(value, '%m/%d/%Y %I:%M:%S %p')
+
+        for value in ('02/30/2016 12:00:00 PM', '11/15/2015 13:19:44 PM', '11/15/2015 12:19:44',
+                      '2015-11-15 00:19:44', ''):
+            with self.assertRaises(ValueError):
+                to_date(value)
+
+    def test_to_date_cache(self):
+        utils._dates.clear()
+        date = to_date('11/15/2015 12:19:44 AM')
+        assert to_date('11/15/2015 12:19:44 AM') is date
+
+        start = datetime(2015, 11, 15)
+        for seconds in range(utils.DATES_CACHE_SIZE + 10):
+            date = start + timedelta(seconds=seconds)
+            assert to_date(date.strftime('%m/%d/%Y %I:%M:%S %p')) == date
+        assert len(utils._dates) <= utils.DATES_CACHE_SIZE
+
+    def test_to_unicode(self):
+        assert to_unicode(u'Jos\xe9') == u'Jos\xe9'
+        assert to_unicode('Jos\xc3\xa9') == u'Jos\xe9'
+        assert isinstance(to_unicode('12345'), unicode)
+        assert to_unicode(u'') == u''
+
+        # values still parsed as XML
+        assert to_unicode(u'Jos\xe9 &amp; Maria') == u'Jos\xe9 & Maria'
+        assert to_unicode(u'a\r\nb') == u'a\nb'
+
+    def test_extract_dict(self):
+        body = extract_dict(EXTRACT_XML, ('OpResponse', 'OpResult'))
+
+        assert body == {
+            'CorrelationId': None,
+            'Success': u'true',
+            'Name': u'Jos\xe9 & Maria',
+            'Collection': {
+                'Item': [
+                    {'Id': u'1'},
+                    {'Id': u'2', 'Nested': {'guid': u'abc'}},
+                ],
+            },
+        }
+        assert isinstance(body['Success'], unicode)
+
+    def test_extract_dict_from_unicode(self):
+        body = extract_dict(EXTRACT_XML.decode('utf-8'), ('OpResponse', 'OpResult'))
+
+        assert body['Name'] == u'Jos\xe9 & Maria'
+
+    def test_extract_dict_with_missing_path(self):
+        assert extract_dict(EXTRACT_XML, ('OpResponse', 'MissingResult')) == {}
+        assert extract_dict(EXTRACT_XML, ('Success',)) == {}
+
+    def test_extract_fields(self):
+        path = ('OpResponse', 'OpResult')
+
+        assert extract_fields(EXTRACT_XML, path, ('CorrelationId', 'Success')) == {
+            'CorrelationId': None,
+            'Success': u'true',
+        }
+        # only the children of the element at path
+        assert extract_fields(EXTRACT_XML, path, ('Name', 'Id', 'Missing')) == {
+            'Name': u'Jos\xe9 & Maria',
+        }
+        assert extract_fields(EXTRACT_XML, ('OpResponse', 'MissingResult'), ('Success',)) == {}
+
     def test_mask_card_data_from_xml_with_existing_card_number(self):
         xml = '<CardNumber>1234567890123456</CardNumber>'
 
@@ -70,6 +157,16 @@ class UtilsTest(BraspagTestCase):
         assert (mask_card_data_from_xml(xml) ==
                 '<CardNumber>123456******3456</CardNumber><CardSecurityCode>***</CardSecurityCode>')
 
+    def test_mask_card_data_from_xml_with_holder_and_tokens(self):
+        xml = (u'<CardHolder>Jose da Silva</CardHolder><CardNumber>1234567890123456</CardNumber>'
+               u'<JustClickKey>715775f5</JustClickKey><CreditCardToken>14b709ea</CreditCardToken>'
+               u'<CardExpiration>05/2018</CardExpiration>')
+
+        assert (mask_card_data_from_xml(xml) ==
+                u'<CardHolder>*************</CardHolder><CardNumber>123456******3456</CardNumber>'
+                u'<JustClickKey>********</JustClickKey><CreditCardToken>********</CreditCardToken>'
+                u'<CardExpiration>05/2018</CardExpiration>')
+
     def test_is_valid_guid(self):
         self.assertTrue(is_valid_guid('555d97f7-92ab-4907-a8d0-f2ba51afe470'))
         self.assertTrue(is_valid_guid('937f36f1-8b8d-427e-83f1-02faadcdf6eb'))
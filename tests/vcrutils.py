@@ -1,8 +1,16 @@
 # encoding: utf-8
 import inspect
 import os
+from io import BytesIO
 
 import vcr
+import yaml
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPRequest
+from tornado.httpclient import HTTPResponse
+
+
+CASSETTES_DIR = os.path.join(os.path.dirname(__file__), 'cassettes')
 
 
 def path_generator(function):
@@ -12,3 +20,35 @@ def path_generator(function):
 
 
 replay = vcr.VCR(func_path_generator=path_generator).use_cassette
+
+
+def recorded_body(cassette, index):
+    """Return the response body of the index-th interaction of a cassette"""
+    with open(os.path.join(CASSETTES_DIR, '{}.yml'.format(cassette))) as f:
+        interactions = yaml.load(f, Loader=yaml.Loader)['interactions']
+
+    body = interactions[index]['response']['body']['string']
+    if isinstance(body, unicode):
+        body = body.encode('utf-8')
+    return body
+
+
+def response_future(body, code=200):
+    """Return a resolved Future with an HTTPResponse, as returned by
+    BaseRequest.fetch
+    """
+    request = HTTPRequest('http://localhost/')
+    future = Future()
+    future.set_result(HTTPResponse(request, code, buffer=BytesIO(body)))
+    return future
+
+
+def recorded_response(cassette, index, code=200):
+    """Return the index-th response of a cassette, see response_future"""
+    return response_future(recorded_body(cassette, index), code)
+
+
+def failed_response(error):
+    future = Future()
+    future.set_exception(error)
+    return future